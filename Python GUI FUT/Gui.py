@@ -5,9 +5,28 @@ from kivy.uix.popup import Popup
 from kivy.clock import Clock, mainthread
 import TradingParameters
 import threading
-import requests
+from fut.catalogue import catalogue
 from TradingBot import TradingBot
 
+catalogueLoader = None  # thread loading players database and search index
+
+
+def loadCatalogue():
+    """Downloads players database and builds search index in background, so searching never blocks the UI"""
+    global catalogueLoader
+    if catalogueLoader is not None and catalogueLoader.is_alive():
+        return
+    catalogueLoader = threading.Thread(target=warmCatalogue, name='catalogue-loader')
+    catalogueLoader.daemon = True
+    catalogueLoader.start()
+
+
+def warmCatalogue():
+    try:
+        catalogue.index()
+    except Exception as e:  # search will try again
+        print("Unable to load players database: " + repr(e))
+
 
 class TradingWindow(Screen):
     """Trading Window screen. Created in 'TradingWindow.kv'. This screen outputs the actions of the bot and also
@@ -47,34 +66,24 @@ class TradingWindow(Screen):
 class TradingParameters(Screen):
     """Trading Parameter screen. Created in 'TradingParameters.kv'. This screen allows one to configure
     the bot's actions"""
-    def search(self, name, lyst):
-        matches = []
-        for item in lyst:
-            try:
-                if name in item['c']:
-                    matches.append(item)
-            except KeyError:
-                if name in item['l']:
-                    matches.append(item)
-        return matches
-
-    def searchForPlayer(self, name, lyst):
-        """Searches for the player in the fut database"""
-        r = requests.get(
-            "https://www.easports.com/fifa/ultimate-team/web-app/content/B1BA185F-AD7C-4128-8A64-746DE4EC5A82/2018/fut/items/web/players.json")
-        players = r.json()
+    def searchForPlayer(self, name, rv):
+        """Searches for the player in the fut database. There are no results until the database is loaded"""
         self.results = []
-        for playerType in players:
-            self.results += self.search(name, players[playerType])
-
-        for player in self.results:
+        if not catalogue.ready():
+            loadCatalogue()
+        else:
             try:
-                lyst.insert(0, {'text': player['c'] + " " + str(player['r'])})
-            except KeyError:
-                lyst.insert(0, {'text': player['f'] + " " + player['l'] + " " + str(player['r'])})
-        self.results.reverse()
-        for player in self.results:
-            print(player)
+                self.results = catalogue.search(name, limit=100)
+            except Exception as e:
+                print("Player search failed: " + repr(e))
+        self.ids.checked.clear_selection()  # indexes of old results are no longer valid
+        rv.data = [{'text': (player.get('c') or player['f'] + " " + player['l']) + " " + str(player['r'])}
+                   for player in self.results]
+
+    def searchAsYouType(self, name, rv):
+        """Updates search results while the user is typing"""
+        if len(name.strip()) >= 3:
+            self.searchForPlayer(name, rv)
 
     def addPlayerToBidList(self, lyst, rv, maxPriceTuple):
         """Adds the selected player and price to the bots bid list"""
@@ -160,6 +169,7 @@ class LoginScreen(Screen):
         Will request ea code if needed."""
         try:
             App.bot = TradingBot(username, password, secretAnswer)
+            loadCatalogue()  # ready before the user starts searching
             self.updateScreen()
         except:
             self.remove_widget(self.loadingGif)
@@ -1,22 +1,41 @@
 import fut
+from fut import metrics, cache
+from fut.session import accountName
+from fut.tracing import tracer, traced
+from fut.actions import ActionPlan
+from fut.bidwar import BidWar
+from fut.scheduler import Scheduler
+from fut.pipeline import SearchPipeline
+from fut.sniper import Sniper
+from fut.watchlist import WatchlistState
+from fut.catalogue import catalogue
 import time
-import random
-import requests
+import functools
 from prettytable import PrettyTable
 
 
 class TradingBot():
     """Class that represents the trading bot. Keeps track of player bought and sold among many other things."""
+    bidWindow = 60  # seconds before auction end when we start bidding
+    refreshInterval = 300  # maximum seconds between watch list refreshes
+    metricsFile = 'metrics-%s.prom'  # prometheus text metrics (in cache dir, per account), rewritten every cycle
+    traceFile = 'trace-%s.folded'  # sampled cycle timings (flame graph folded stacks, in cache dir, per account), rewritten every cycle
+
     def __init__(self, username, password, secretAnswer, coinLimit = 0):
-        self.session = fut.Core(username, password, secretAnswer)
+        self.session = fut.Core(username, password, secretAnswer, budget=500)  # market must not be pinged more that 500 times in one hour
+        self.metricsFile = cache.path(self.metricsFile % accountName(username))
+        self.traceFile = cache.path(self.traceFile % accountName(username))
         self.boughtPlayers = []
         self.soldPlayers = []
-        self.coins = self.session.keepalive()
-        self.actionCount = 0  # necessary to make sure market is not pinged more that 500 times in one hour
+        self.coins = self.session.balance()
         self.playersToTrade = {}
         self.coinLimit = coinLimit
         self.tradeStartTime = 0
         self.allowTrade = True
+        self.watchListState = WatchlistState()  # last fetched watch list, fetches are diffed against it
+        self.watchListRows = {}  # tradeId: row of watch list view
+        self.handledTrades = set()  # won/lost trades already recorded (failed move reports them again)
+        self.sniper = Sniper(self.session, self.playersToTrade)  # buy now searches, shares max prices with bidding
 
     def addPlayerToBidList(self, lyst):
         """Updates the players that the bot is currently trading"""
@@ -34,11 +53,10 @@ class TradingBot():
         return self.coinLimit
 
     def getActionCount(self):
-        """Returns the bot's action count"""
-        return self.actionCount
+        """Returns the bot's action count (requests sent in the last hour)"""
+        return self.session.limiter.used()
 
-    def updateActionCount(self, integer, progressBar):
-        self.actionCount += integer
+    def updateActionCount(self, progressBar):
         print("Updating action count: " + str(self.getActionCount()))
         progressBar.value = self.getActionCount()
 
@@ -54,20 +72,34 @@ class TradingBot():
         """This allows the bot to start trading"""
         self.allowTrade = True
 
-    def outputWatchlist(self, watchList, watchListView):
-        """This outputs a nicely formatted string to watch list recycle view"""
+    @traced()
+    def outputWatchlist(self, events, watchListView):
+        """Updates only the changed rows of the watch list recycle view"""
         watchListOutput = PrettyTable()
-        watchListOutput.field_names = ["Player Names", "Price", "Time"]
-        watchListView.data = []
-        for player in watchList:
-            watchListOutput.add_row([self.getPlayerName(player), self.getCurrentPlayerPrice(player), player['expires']])
-        print(watchListOutput)
-        for player in watchList:
-            # TODO: Properly format the Watch List Status Window
-            #print("%-15s %-3d %6d" % (self.getPlayerName(player), self.getCurrentPlayerPrice(player), player['expires']))
-            watchListView.data.insert(len(watchListView.data),
-                            {'value': str(self.getPlayerName(player) + " " + str(self.getCurrentPlayerPrice(player)) + " " + str(player['expires']))})
-
+        watchListOutput.field_names = ["Change", "Player Names", "Price", "Ends"]
+        resize = False
+        for e in events:
+            if e.kind == 'removed':
+                self.watchListRows.pop(e.trade_id, None)
+                resize = True
+                continue
+            if e.trade_id not in self.watchListRows:
+                self.watchListRows[e.trade_id] = {}
+                resize = True
+            player = e.item
+            # end time doesn't change between fetches (unlike seconds left)
+            ends = time.strftime("%I:%M:%S", time.localtime(time.time() + self.getExpires(player)))
+            self.watchListRows[e.trade_id]['value'] = str(self.getPlayerName(player) + " " +
+                                                         str(self.getCurrentPlayerPrice(player)) + " " + ends)
+            watchListOutput.add_row([e.kind, self.getPlayerName(player), self.getCurrentPlayerPrice(player), ends])
+        if events:
+            print(watchListOutput)
+        if resize:
+            watchListView.data = list(self.watchListRows.values())
+        elif events:
+            watchListView.refresh_from_data()
+
+    @traced()
     def getWatchList(self):
         """Get the watchlist. Handles HTML timeouts"""
         try:
@@ -76,60 +108,90 @@ class TradingBot():
         except:
             print("HTML TIMEOUT. TRYING AGAIN")
             time.sleep(15)
-            self.getWatchList()
+            return self.getWatchList()
     # TODO: Fix error that occurs when player added to list while program is running
     
     def trade(self, dictionary, progressBar, currentCoin, watchListView, boughtItemCount):
-        """The trading loop for the bot"""
+        """The trading loop for the bot. Sleeps until the next auction enters its bidding window"""
         print("Warming up...")
-        self.addPlayersToWatchList(dictionary, progressBar)
+        with metrics.mode('warm_up'):
+            self.addPlayersToWatchList(dictionary, progressBar)
         print("Done adding players to bid list...")
-        coinBalance = self.session.keepalive()
-        currentCoin.text = "Current Balance: " + str(coinBalance)
+        currentCoin.text = "Current Balance: " + str(self.session.balance())
         self.tradeStartTime = time.monotonic()
         self.session.relist()
 
-        while coinBalance > self.coinLimit and self.allowTrade:
-            if self.actionCount >= 500:
-                print("Time to sleep: " + str(3600 - (time.monotonic() - self.tradeStartTime)))
-                time.sleep(3600 - (time.monotonic() - self.tradeStartTime))
-                # TODO: Need to fix timeout issue here
-                self.tradeStartTime = 0
-                self.updateActionCount(-500, progressBar)
-
-            # Update GUI information
-            coinBalance = self.session.keepalive()
-            currentCoin.text = "Current Balance: " + str(coinBalance)
-            boughtItemCount.text = "Bought Items: " + str(len(self.boughtPlayers))
-
-            # Reset action count and relist trade piles every hour
-            if time.monotonic() - self.tradeStartTime > 3600:
-                self.actionCount = 0
-                self.tradeStartTime = 0
-                print("Relisting...")
-                self.session.relist()
-
-            self.updateActionCount(2, progressBar)
-            watchList = self.getWatchList()
-
-            print(str(len(watchList)) + str(watchList))
-            self.outputWatchlist(watchList, watchListView)
-
-            if len(watchList) > 0:
-                nextWatchListExpire = watchList[0]['expires']
-            else:
-                nextWatchListExpire = 1000 # Go into normal loop
-            print(nextWatchListExpire)
-
-            # Choose which loop to enter
-            if nextWatchListExpire < 120:
-                self.getAggressive(dictionary, watchList, progressBar)
-            elif nextWatchListExpire < 3000 and self.actionCount < 300:
-                self.buyNowMode(nextWatchListExpire, watchList, progressBar)
-            else:
-                self.watchListLoop(dictionary, watchList, progressBar)
+        # New scheduler knows nothing about auctions, so whole watch list is reported as new on first cycle
+        self.watchListState.reset()
+        self.watchListRows = {}
+        watchListView.data = []
 
-            time.sleep(random.randrange(1, 3))
+        # Every request is paid from the hourly budget, events which can't get it before their deadline are dropped
+        self.scheduler = Scheduler(self.session.limiter)
+        self.bidWar = BidWar(self.session, self.scheduler)  # final seconds of auctions, shares scheduler with the loop
+        self.scheduler.at(time.monotonic(), functools.partial(self.cycle, dictionary, progressBar, currentCoin,
+                                                              watchListView, boughtItemCount), key='cycle', cost=3)
+        self.scheduler.run(stop=lambda: not self.allowTrade or self.session.credits <= self.coinLimit)
+
+    def cycle(self, dictionary, progressBar, currentCoin, watchListView, boughtItemCount, event):
+        """Refreshes the watch list, cleans it up and schedules bidding windows of open auctions"""
+        try:
+            with metrics.mode('cycle'), tracer.span('cycle'):
+                self.refresh(dictionary, progressBar, currentCoin, watchListView, boughtItemCount, event)
+        finally:
+            if self.scheduler.scheduled('cycle') is None:  # refresh failed before scheduling next cycle
+                self.scheduler.at(time.monotonic() + self.refreshInterval, event.callback, key='cycle', cost=3)
+        metrics.registry.write(self.metricsFile)
+        tracer.write(self.traceFile)
+
+    def refresh(self, dictionary, progressBar, currentCoin, watchListView, boughtItemCount, event):
+        """One cycle - fetches the watch list, acts on its changes and spends idle time on buy now"""
+        # Update GUI information (balance is tracked from responses, keepalive only when it's stale)
+        currentCoin.text = "Current Balance: " + str(self.session.balance())
+        boughtItemCount.text = "Bought Items: " + str(len(self.boughtPlayers))
+
+        # Relist trade piles every hour
+        if time.monotonic() - self.tradeStartTime > 3600:
+            self.tradeStartTime = time.monotonic()
+            print("Relisting...")
+            self.session.relist()
+
+        self.updateActionCount(progressBar)
+        watchList = self.getWatchList()
+        for name, tradeId, x in self.session.auctions.poll():
+            print("Auction %s: %s" % (tradeId, name))
+        # Only changed auctions are processed
+        events = self.watchListState.sync(watchList)
+        self.outputWatchlist(events, watchListView)
+        deleted = self.watchListLoop(dictionary, events, progressBar)
+
+        # Wake up exactly when auctions enter their bidding window (deleted ones are not worth a trade status)
+        for e in events:
+            if e.kind in ('new', 'outbid', 'price_changed') and e.trade_id not in deleted and self.scheduler.scheduled(e.trade_id) is None:
+                deadline = self.session.auctions.deadline(e.trade_id)  # absolute, corrected for request latency
+                if deadline is not None and deadline > time.monotonic():
+                    self.scheduler.at(deadline - self.bidWindow, functools.partial(self.finalWindow, dictionary, progressBar, e.item),
+                                      key=e.trade_id, deadline=deadline, cost=2)
+        deadlines = [d for d in (self.session.auctions.deadline(x['tradeId']) for x in self.watchListState
+                                 if x['tradeState'] == 'active') if d is not None and d > time.monotonic()]
+
+        # Refresh again after next auction ends (to collect it) or after refreshInterval
+        nextCycle = min(deadlines + [time.monotonic() + self.refreshInterval]) + 1
+        self.scheduler.at(nextCycle, event.callback, key='cycle', cost=3)
+
+        # Spend idle time before next bidding window on buy now searches
+        nextWindow = min(deadlines) - self.bidWindow if deadlines else nextCycle
+        if nextWindow - time.monotonic() > 150 and self.getActionCount() < 300:
+            self.buyNowMode(nextWindow - time.monotonic(), watchList, progressBar)
+
+    @traced()
+    def finalWindow(self, dictionary, progressBar, x, event):
+        """Auction entered its bidding window - bid war engine checks it and times counter-bids until its end"""
+        maxPrice = min(self.getMaxBidPrice(x), self.session.credits - self.coinLimit)
+        dictionary.insert(len(dictionary), {'value': str(time.strftime("%I:%M:%S") + ": Bidding on " +
+                                                         self.getPlayerName(x) + " up to " + str(maxPrice))})
+        self.bidWar.join(x, maxPrice)
+        self.updateActionCount(progressBar)
 
     def getMaxBidPrice(self, bidPlayer):
         """Gets price to pay on players"""
@@ -160,18 +222,12 @@ class TradingBot():
     @staticmethod
     def getPlayerName(bidPlayer):
         """Returns the player name given the assetID"""
-        r = requests.get(
-            "https://www.easports.com/fifa/ultimate-team/web-app/content/B1BA185F-AD7C-4128-8A64-746DE4EC5A82/2018/fut/items/web/players.json")
-        players = r.json()
-        name = ''
-        for playerType in players:
-            for player in players[playerType]:
-                if player['id'] == bidPlayer['assetId']:
-                    try:
-                        name = player['c']
-                    except:
-                        name = player['f'] + " " + player['l']
-                    return name
+        return catalogue.name(bidPlayer['assetId'])
+
+    def getExpires(self, x):
+        """Returns seconds left in the auction, counted from its tracked deadline (not from the last fetch)"""
+        remaining = self.session.auctions.remaining(x['tradeId'])
+        return x['expires'] if remaining is None else int(remaining)
 
     @staticmethod
     def getCurrentPlayerPrice(x):
@@ -181,169 +237,107 @@ class TradingBot():
             price = x['currentBid']
         return price
 
+    @traced()
     def addPlayersToWatchList(self, dictionary, progressBar):
-        """Begins the trading loop for the bot. Adds all players to search for in the bot"""
-        for player in self.playersToTrade:
-            startPage = 1
-            while True:
-                auctionPlayers = self.session.search(ctype='player', start=startPage, assetId=player, max_price=self.playersToTrade[player])
-                self.updateActionCount(1, progressBar)
-
-                # Go through each player and bid
-                for x in auctionPlayers:
-                    print(self.getPlayerName(x))
-                    # Get the price of the current player
-                    price = self.getNextBidPrice(x)
-
-                    # Bid given the right scenario
-                    print(x)
-                    dictionary.insert(len(dictionary), {'value': str(time.strftime("%I:%M:%S") +
-                                                                     ": Attempting to bid on " + self.getPlayerName(x) +
-                                                                     " for " + str(price))})
-
-                    if x['expires'] < 3600 and not x['tradeState'] == 'closed' and not x['bidState'] == 'highest' and not price is None:
-                        if self.session.bid(x['tradeId'], price):
-                            dictionary.insert(len(dictionary),
-                                              {'value': str(time.strftime("%I:%M:%S") + ": Bid Successful")})
-                            print("Bid Successful")
-                        self.updateActionCount(1, progressBar)
-                    else:
-                        dictionary.insert(len(dictionary), {'value':
-                                                                str(time.strftime("%I:%M:%S") +
-                                                                    ": Bid Failed. Expires in " + str(x['expires']))})
-                        if x['expires'] > 3600:
-                            break
-                        # TODO Provide more reasoning for why bid failed. EX: "Not enough money"
-
-                    time.sleep(random.randrange(2, 4))
-                    # Finished bidding on this page
-
-                # Begin loop on the next page
-                startPage += 16
-
-                # Break if on the last page or more than an hour out
-                if len(auctionPlayers) < 16 or auctionPlayers[-1]['expires'] > 3600 and not self.allowTrade:
-                    break
-
-            print("Done with current player ...")
-            time.sleep(random.randrange(6, 12))
-
-    def watchListLoop(self, dictionary, watchList, progressBar, aggressive = False):
-        """Runs the each player and the watchlist and performs the appropriate action."""
-        dictionary.insert(len(dictionary),
-                          {'value': str(time.strftime("%I:%M:%S") + ": Searching watch list for actions...")})
-
-        for x in watchList:
+        """Begins the trading loop for the bot. Searches all players at once and bids on auctions as they are found"""
+        # pages of all players are interleaved and paced by the session's request budget, duplicates are skipped
+        pipeline = SearchPipeline(self.session, self.playersToTrade, max_expires=3600)
+        for x in pipeline:
+            if not self.allowTrade:
+                break
             # Get the price of the current player
             price = self.getNextBidPrice(x)
 
-            if price is None:
-                if x['bidState'] == 'outbid':
-                    dictionary.insert(len(dictionary),
-                                      {'value': str(
-                                          time.strftime("%I:%M:%S") + ": Player is to expensive.")})
-                    dictionary.insert(len(dictionary),
-                                      {'value': str(time.strftime("%I:%M:%S") + ": " + self.getPlayerName(x) +
-                                                    " deleted from watch list.")})
-                    self.session.watchlistDelete(x['tradeId'])
-
-                elif x['bidState'] == 'highest' and x['tradeState'] == 'closed':
-                    dictionary.insert(len(dictionary),
-                                      {'value': str(
-                                          time.strftime("%I:%M:%S") + ": Won auction!")})
+            # Bid given the right scenario
+            if x['tradeState'] == 'closed' or x['bidState'] == 'highest' or price is None:
+                dictionary.insert(len(dictionary), {'value': str(time.strftime("%I:%M:%S") + ": Skipped " +
+                                                                 self.getPlayerName(x) + ". Expires in " + str(x['expires']))})
+                continue
+            dictionary.insert(len(dictionary), {'value': str(time.strftime("%I:%M:%S") +
+                                                             ": Attempting to bid on " + self.getPlayerName(x) +
+                                                             " for " + str(price))})
+            # trade status is already cached from the search, bid doesn't have to ask for it again
+            if self.session.bid(x['tradeId'], price):
+                dictionary.insert(len(dictionary),
+                                  {'value': str(time.strftime("%I:%M:%S") + ": Bid Successful")})
+            else:
+                # TODO Provide more reasoning for why bid failed. EX: "Not enough money"
+                dictionary.insert(len(dictionary),
+                                  {'value': str(time.strftime("%I:%M:%S") + ": Bid Failed. Expires in " + str(x['expires']))})
+            self.updateActionCount(progressBar)
+        stats = pipeline.stats()
+        print("Done adding players: %(searches)d searches, %(trades)d trades, first candidate after %(first_candidate)s s" % stats)
+
+    @traced()
+    def watchListLoop(self, dictionary, events, progressBar):
+        """Acts on watch list changes. Won players go to the trade pile, lost and too expensive ones are deleted.
+        Returns trade ids deleted from the watch list"""
+        # watch list deletes and trade pile moves are sent together at the end of the cycle
+        plan = ActionPlan(self.session)
+        planned = {}  # id used by action: tradeId
+        for e in events:
+            x = e.item
+            if e.kind == 'won':
+                if e.trade_id not in self.handledTrades:
+                    self.handledTrades.add(e.trade_id)
                     dictionary.insert(len(dictionary),
-                                      {'value': str(time.strftime("%I:%M:%S") + ": " + self.getPlayerName(x) +
-                                                    " sent to trade pile")})
+                                      {'value': str(time.strftime("%I:%M:%S") + ": Won auction! Sending " +
+                                                    self.getPlayerName(x) + " to trade pile...")})
                     self.boughtPlayers.append(x)
-                    self.session.sendToTradepile(x['id'])
+                    self.bidWar.settle(e.trade_id, True, x['currentBid'])
+                plan.move(x['id'], 'trade')  # tried again every cycle until tradepile has room
+                planned[x['id']] = e.trade_id
 
-            elif x['tradeState'] == 'closed':
-                # Lost auction. Delete from watch list.
-                if not x['bidState'] == 'highest':
-                    dictionary.insert(len(dictionary),
-                                      {'value': str(
-                                          time.strftime("%I:%M:%S") + ": Lost auction.")})
-                    dictionary.insert(len(dictionary), {'value': str(time.strftime("%I:%M:%S") + ": Removing " +
-                                                                     self.getPlayerName(x) + " from watch list...")})
-                    self.session.watchlistDelete(x['tradeId'])
-
-                # Won auction. Send to the trade pile.
-                else:
+            elif e.kind in ('lost', 'expired'):
+                if e.trade_id not in self.handledTrades:
+                    self.handledTrades.add(e.trade_id)
                     dictionary.insert(len(dictionary),
-                                      {'value': str(
-                                          time.strftime("%I:%M:%S") + ": Won Auction.")})
-                    dictionary.insert(len(dictionary),
-                                      {'value': str(time.strftime("%I:%M:%S") + ": Sending " + self.getPlayerName(x) +
-                                                    " to trade pile...")})
-                    print("Sending player to trade pile ..." + str(x))
-
-                    self.boughtPlayers.append(x)
-                    self.session.sendToTradepile(x['id'])
-
-            elif x['expires'] < 3600 and not x['tradeState'] == 'closed' and not x['bidState'] == 'highest':
-                dictionary.insert(len(dictionary), {'value': str(time.strftime("%I:%M:%S") +
-                                                                 ": Attempting to bid on " + self.getPlayerName(x) +
-                                                                " for " + str(price))})
-                try:
-
-                    if self.session.bid(x['tradeId'], price):
-                        dictionary.insert(len(dictionary),
-                                          {'value': str(time.strftime("%I:%M:%S") + ": Bid Successful")})
-                        print("Bid Successful: " + str(x))
-                    else:
-                        dictionary.insert(len(dictionary), {'value': str(time.strftime("%I:%M:%S") + ": Bid Failed")})
-                    self.updateActionCount(1, progressBar)
-                    time.sleep(random.randrange(1, 4))
-                except Exception:
-                    print(Exception)  # This might cause problems
-
-            # Aggressive is True when using getAggressive().
-            if aggressive is True:
-                if x['expires'] > 60:
-                    print("Breaking due to expiration time")
-                    break
-
-        if aggressive is False:
-            dictionary.insert(len(dictionary),
-                              {'value': str(time.strftime("%I:%M:%S") + ": Waiting...")})
-            time.sleep(random.randrange(20, 40))
-
-    def getAggressive(self, dictionary, watchList, progressBar):
-        """Allows one to win more bid wars by waiting less and only bidding on watch list players
-        if they expire in less than a minute"""
-        print("GOING AGGRESSIVE")
-        self.watchListLoop(dictionary, watchList, progressBar, aggressive = True)
-
+                                      {'value': str(time.strftime("%I:%M:%S") + ": Lost auction. Removing " +
+                                                    self.getPlayerName(x) + " from watch list...")})
+                    self.bidWar.settle(e.trade_id, False)
+                plan.delete(e.trade_id)
+                planned[e.trade_id] = e.trade_id
+
+            elif e.kind in ('new', 'outbid', 'price_changed') and x['bidState'] == 'outbid' and self.getNextBidPrice(x) is None:
+                dictionary.insert(len(dictionary),
+                                  {'value': str(time.strftime("%I:%M:%S") + ": " + self.getPlayerName(x) +
+                                                " is too expensive, deleted from watch list.")})
+                plan.delete(e.trade_id)
+                planned[e.trade_id] = e.trade_id
+                self.bidWar.leave(e.trade_id)
+
+        deleted = set(plan.deletes)
+        for failed in self.commitActions(plan, dictionary):
+            self.watchListState.forget(planned[failed])  # reported again after next fetch
+        if self.bidWar.settled and any(e.kind in ('won', 'lost') for e in events):
+            print("Bid war: won %(won)d of %(contested)d, overpaid %(overpaid)d coins, %(actions_per_auction).1f actions per auction" % self.bidWar.stats())
+        self.updateActionCount(progressBar)
+        return deleted
+
+    @traced()
+    def commitActions(self, plan, dictionary):
+        """Sends planned watch list deletes and pile moves, reports and returns ids of items that failed"""
+        failed = []
+        if not len(plan):
+            return failed
+        for action, items in plan.commit().items():
+            for itemId, result in items.items():
+                if not result['success']:
+                    failed.append(itemId)
+                    dictionary.insert(len(dictionary), {'value': str(time.strftime("%I:%M:%S") + ": " + action +
+                                                                     " failed for " + str(itemId) + ": " +
+                                                                     str(result['reason']))})
+        return failed
+
+    @traced()
     def buyNowMode(self, nextWatchListExpire, watchList, progressBar):
         """Buy now mode. Will go through and attempt to buy players at the users defined max price"""
         if len(self.playersToTrade) == 0: return
-        startTime = time.monotonic()
-        searches = 0
-        playerId = random.choice(list(self.playersToTrade.keys()))
-        print(self.session.cardInfo(playerId))
-
-        while self.allowTrade and self.getActionCount() < 500:
-            if time.monotonic() - startTime > nextWatchListExpire - 50:
-                break
-
-            if time.monotonic() - startTime > 100:
-                break
-
-            print("checking for bin")
-            binSearch = self.session.search(ctype='player', assetId=playerId,
-                                                 max_buy=self.playersToTrade.get(playerId))
-            print(binSearch)
-            for player in binSearch:
-                print("Found ITEM>>>>>")
-                if self.session.bid(player["tradeId"], player['buyNowPrice']):
-                    print("YESSSSSSSS")
-                    self.boughtPlayers.append(player)
-            time.sleep(random.randrange(1,2))
-            self.updateActionCount(1, progressBar)
-            searches += 1
-            if searches == 15:
-                time.sleep(10)
-                searches = 0
+        # snipe until shortly before the next bidding window, but no longer than 100 seconds
+        bought = self.sniper.run(time.monotonic() + min(nextWatchListExpire - 50, 100), stop=lambda: not self.allowTrade)
+        self.boughtPlayers.extend(bought)
+        self.updateActionCount(progressBar)
+        print("Buy now: %(searches)d searches, %(bought)d bought, median latency %(latency_median)s s" % self.sniper.stats())
 
 
 # TODO: Bought players history list
@@ -0,0 +1,121 @@
+# -*- coding: utf-8 -*-
+
+"""
+Buy now detection-to-purchase latency and searches per minute (simulated).
+
+before: TradingBot.buyNowMode loop - non-fast search (OPTIONS + random delay),
+        bid(fast=False) with trade status round trip before buying, fixed sleeps.
+after:  fut.sniper.Sniper.step - run as is against the same fake core.
+
+Fake core keeps virtual time: minimum delays between requests are taken from
+fut.config (delay / fast_delay), round trips are drawn from the same
+distribution for both. Bargains are listed at random prices up to max buy now
+price (inclusive) and are gone after one search.
+
+Usage: python benchmarks/buy_now_latency.py [searches] [rtt_ms] [seed]
+"""
+
+import sys
+import random
+
+from fut.config import delay, fast_delay
+from fut.sniper import Sniper, priceStep
+
+TARGETS = {20801: 15000, 158023: 40000, 190871: 2000}
+LISTING_CHANCE = 0.1  # chance that search finds a bargain
+
+
+class Limiter(object):
+    def remaining(self):
+        return float('inf')
+
+
+class FakeCore(object):
+    """Core's search/bid interface on virtual time."""
+    def __init__(self, rtt, seed):
+        self.rtt = rtt
+        self.rnd = random.Random(seed)
+        self.market = random.Random(seed + 1)  # same listings for both strategies
+        self.now = 0.0
+        self.last = -3600  # last request sent
+        self.limiter = Limiter()
+        self.credits = 10 ** 7
+        self.last_request_time = (None, None)
+        self.urls = set()
+        self.listed = 0
+        self.trade_id = 0
+
+    def clock(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.now += seconds
+
+    def __request(self, fast):
+        gap = fast_delay if fast else self.rnd.randrange(delay[0], delay[1] + 1)  # like RateLimiter._gap
+        self.now = max(self.now, self.last + gap)
+        self.last = self.now
+        if not fast:
+            self.now += self.rnd.expovariate(1.0 / self.rtt)  # OPTIONS preflight
+        sent = self.now
+        self.now += self.rnd.expovariate(1.0 / self.rtt)
+        self.last_request_time = (sent, self.now)
+
+    def search(self, ctype, assetId, min_price=None, min_buy=None, max_buy=None, fast=False):
+        self.__request(fast)
+        self.urls.add((assetId, min_price, min_buy, max_buy))
+        if self.market.random() >= LISTING_CHANCE:
+            return []
+        max_price = TARGETS[assetId]
+        price = max_price - self.market.randrange(0, 4) * priceStep(max_price)  # top price steps under max
+        self.listed += 1
+        self.trade_id += 1
+        item = {'tradeId': self.trade_id, 'assetId': assetId, 'buyNowPrice': price}
+        if (max_buy and price > max_buy) or (min_buy and price < min_buy):
+            return []
+        return [item]
+
+    def bid(self, trade_id, bid, fast=False):
+        if not fast:
+            self.__request(False)  # trade status check
+        self.__request(fast)
+        return True
+
+
+def before(searches, rtt, seed):
+    core = FakeCore(rtt, seed)
+    rnd = random.Random(seed + 2)
+    latencies = []
+    for n in range(searches):
+        player = rnd.choice(sorted(TARGETS))
+        items = core.search(ctype='player', assetId=player, max_buy=TARGETS[player])
+        detected = core.last_request_time[1]
+        for item in items:
+            if core.bid(item['tradeId'], item['buyNowPrice']):
+                latencies.append(core.last_request_time[1] - detected)
+        core.sleep(1)
+        if n % 15 == 14:
+            core.sleep(10)
+    return core, latencies
+
+
+def after(searches, rtt, seed):
+    core = FakeCore(rtt, seed)
+    sniper = Sniper(core, dict(TARGETS), clock=core.clock)
+    for _ in range(searches):
+        sniper.step()
+    return core, [a['latency'] for a in sniper.attempts if a['success']]
+
+
+def main(searches=500, rtt=120, seed=0):
+    print('%d searches, mean rtt %dms' % (searches, rtt))
+    for name, strategy in (('before (buyNowMode)', before), ('after (Sniper)', after)):
+        core, latencies = strategy(searches, rtt / 1000.0, seed)
+        latencies.sort()
+        print('%-20s searches/min %5.1f, bought %3d of %3d listed, unique urls %3d, latency median %.2fs, p90 %.2fs'
+              % (name, 60 * searches / core.now, len(latencies), core.listed, len(core.urls),
+                 latencies[len(latencies) // 2], latencies[int(len(latencies) * 0.9)]))
+
+
+if __name__ == '__main__':
+    main(*[int(i) for i in sys.argv[1:4]])
@@ -0,0 +1,37 @@
+# -*- coding: utf-8 -*-
+
+"""
+Startup benchmark - `import fut` must not touch the network.
+
+Runs `import fut` in fresh interpreters and fails (exit code 1) when the median
+import time exceeds the budget.
+
+Usage: python benchmarks/import_time.py [budget_seconds] [runs]
+"""
+
+import os
+import sys
+import subprocess
+
+
+def importTime():
+    code = 'import time; t = time.perf_counter(); import fut; print(time.perf_counter() - t)'
+    rc = subprocess.check_output([sys.executable, '-c', code],
+                                 cwd=os.path.join(os.path.dirname(os.path.abspath(__file__)), os.pardir))
+    return float(rc)
+
+
+def main(budget=0.5, runs=5):
+    times = sorted(importTime() for _ in range(runs))
+    median = times[len(times) // 2]
+    print('import fut: median %.1f ms, min %.1f ms, max %.1f ms (budget %.1f ms)'
+          % (median * 1e3, times[0] * 1e3, times[-1] * 1e3, budget * 1e3))
+    if median > budget:
+        print('FAIL: import time over budget')
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    args = sys.argv[1:]
+    sys.exit(main(float(args[0]) if args else 0.5, int(args[1]) if len(args) > 1 else 5))
@@ -0,0 +1,64 @@
+# -*- coding: utf-8 -*-
+
+"""
+Per-lookup cost of player name resolution.
+
+before: TradingBot.getPlayerName - download players.json (skipped here, it's
+        network bound and costs far more than the scan) + parse + linear scan.
+after:  fut.catalogue - index built once, dict lookup.
+
+Usage: python benchmarks/player_lookup.py [players]
+"""
+
+import sys
+import json
+import random
+import timeit
+
+from fut.catalogue import PlayerCatalogue
+
+
+def fakeDatabase(count):
+    rnd = random.Random(0)
+    players = [{'id': 1000 + i,
+                'f': 'First%d' % i,
+                'l': 'Last%d' % i,
+                'r': rnd.randint(45, 95),
+                'n': rnd.randint(1, 200)} for i in range(count)]
+    for p in players[::10]:
+        p['c'] = 'Common%d' % p['id']
+    return {'Players': players[:-500], 'LegendsPlayers': players[-500:]}
+
+
+def before(text, asset_id):
+    players = json.loads(text)
+    for playerType in players:
+        for player in players[playerType]:
+            if player['id'] == asset_id:
+                try:
+                    return player['c']
+                except KeyError:
+                    return player['f'] + " " + player['l']
+
+
+def main(count=15000):
+    data = fakeDatabase(count)
+    text = json.dumps(data)
+    ids = [p['id'] for p in data['Players'] + data['LegendsPlayers']]
+    rnd = random.Random(1)
+
+    catalogue = PlayerCatalogue(ttl=None)
+    catalogue.load(data)
+
+    n = 20
+    t_before = timeit.timeit(lambda: before(text, rnd.choice(ids)), number=n) / n
+    n = 100000
+    t_after = timeit.timeit(lambda: catalogue.name(rnd.choice(ids)), number=n) / n
+    print('players:        %d' % count)
+    print('before (parse): %10.3f us/lookup (+ players.json download)' % (t_before * 1e6))
+    print('after (index):  %10.3f us/lookup' % (t_after * 1e6))
+    print('speedup:        %10.0fx' % (t_before / t_after))
+
+
+if __name__ == '__main__':
+    main(*[int(i) for i in sys.argv[1:2]])
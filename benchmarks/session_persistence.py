@@ -0,0 +1,66 @@
+# -*- coding: utf-8 -*-
+
+"""
+Per-request overhead of session persistence.
+
+before: Core.saveSession after every request - cookies.txt & token.txt rewritten.
+after:  fut.session.SessionStore.update - session marked as dirty, written by
+        background thread every session_flush_interval seconds.
+
+Usage: python benchmarks/session_persistence.py [cookies] [requests]
+"""
+
+import os
+import sys
+import time
+import shutil
+import tempfile
+from http.cookiejar import Cookie, LWPCookieJar
+
+from fut.session import SessionStore
+
+
+def fakeJar(file_path, count):
+    jar = LWPCookieJar(file_path)
+    for i in range(count):
+        jar.set_cookie(Cookie(0, 'cookie%d' % i, 'x' * 64, None, False, '.ea.com', True, True, '/', True,
+                              True, int(time.time()) + 3600, False, None, None, {}))
+    return jar
+
+
+def saveSession(jar, token_file):
+    jar.save(ignore_discard=True)
+    with open(token_file, 'w') as f:
+        f.write('%s %s' % ('Bearer', 'token'))
+
+
+def main(cookies=30, requests=1000):
+    directory = tempfile.mkdtemp()
+    try:
+        cookies_file = os.path.join(directory, 'cookies.txt')
+        token_file = os.path.join(directory, 'token.txt')
+        jar = fakeJar(cookies_file, cookies)
+
+        t = time.perf_counter()
+        for _ in range(requests):
+            saveSession(jar, token_file)
+        before = (time.perf_counter() - t) / requests
+
+        store = SessionStore(cookies_file, token_file)
+        t = time.perf_counter()
+        for _ in range(requests):
+            store.update(jar, 'Bearer', 'token')
+        after = (time.perf_counter() - t) / requests
+        store.close()
+
+        print('%d cookies, %d requests' % (cookies, requests))
+        print('before (saveSession):        %8.1f us/request' % (before * 1e6))
+        print('after  (SessionStore.update): %8.1f us/request' % (after * 1e6))
+        print('speedup: %.0fx' % (before / after))
+    finally:
+        shutil.rmtree(directory)
+
+
+if __name__ == '__main__':
+    args = [int(i) for i in sys.argv[1:]]
+    main(*args)
@@ -0,0 +1,41 @@
+# -*- coding: utf-8 -*-
+
+"""
+Time to first search - full launch vs resumed session (needs real account).
+
+before: every Core goes through full __launch__ (auth, pids/me, shards,
+        accountinfo, ut/auth, phishing, usermassinfo, pinEvents).
+after:  Core resumes snapshot saved by previous process, one user/credits
+        request validates it.
+
+Usage: python benchmarks/time_to_first_search.py email password secret_answer [platform]
+"""
+
+import sys
+import shutil
+import tempfile
+
+import fut
+
+
+def firstSearch(session_dir, *args, **kwargs):
+    session = fut.Core(*args, session_dir=session_dir, **kwargs)
+    session.search('player')
+    return session
+
+
+def main(email, passwd, secret_answer, platform='pc'):
+    session_dir = tempfile.mkdtemp()
+    try:
+        full = firstSearch(session_dir, email, passwd, secret_answer, platform=platform)
+        # no logout - snapshot stays valid for next process
+        resumed = firstSearch(session_dir, email, passwd, secret_answer, platform=platform)
+        print('full login:      %.2fs' % full.time_to_first_search)
+        print('resumed session: %.2fs (resumed=%s)' % (resumed.time_to_first_search, resumed.resumed))
+        resumed.logout()
+    finally:
+        shutil.rmtree(session_dir)
+
+
+if __name__ == '__main__':
+    main(*sys.argv[1:])
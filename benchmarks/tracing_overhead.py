@@ -0,0 +1,46 @@
+# -*- coding: utf-8 -*-
+
+"""
+Cost of fut.tracing spans - one cycle with nested calls like TradingBot's
+(cycle -> 40 traced methods -> __request__), measured per span.
+
+Usage: python benchmarks/tracing_overhead.py [cycles]
+"""
+
+import sys
+import time
+
+from fut.tracing import Tracer, Span
+
+
+def cycle(tracer, traced):
+    if not traced:
+        for _ in range(40):
+            for _ in range(2):
+                pass
+        return
+    with Span(tracer, 'cycle'):
+        for _ in range(40):
+            with Span(tracer, 'Core.method'):
+                with Span(tracer, 'Core.__request__'):
+                    pass
+
+
+def main(cycles=20000):
+    spans = cycles * 81
+    started = time.perf_counter()
+    for _ in range(cycles):
+        cycle(None, False)
+    baseline = time.perf_counter() - started
+    print('%d cycles, %d spans' % (cycles, spans))
+    for rate in (0, 0.05, 1):
+        tracer = Tracer(sample_rate=rate)
+        started = time.perf_counter()
+        for _ in range(cycles):
+            cycle(tracer, True)
+        elapsed = time.perf_counter() - started - baseline
+        print('sample rate %-5s %6.0f ns per span, %5.1f us per cycle' % (rate, 1e9 * elapsed / spans, 1e6 * elapsed / cycles))
+
+
+if __name__ == '__main__':
+    main(*[int(i) for i in sys.argv[1:2]])
@@ -0,0 +1,322 @@
+# -*- coding: utf-8 -*-
+
+"""
+Simulated trading session - wins per action of TradingBot's main loop.
+
+before: loop peeking at watchlist[0]['expires'] and sleeping fixed random
+        intervals (aggressive / buy now / watchlist modes).
+after:  TradingBot's cycle (refresh) run by the real fut.scheduler.Scheduler,
+        auctions in their bidding window handed to the real fut.bidwar.BidWar,
+        idle time spent by the real fut.sniper.Sniper - against a simulated
+        core whose requests go through the real RateLimiter (hourly budget).
+
+Auctions, competitors and buy now offers are simulated on a virtual clock,
+both strategies see exactly the same market (same seed).
+
+Usage: python benchmarks/trading_loop.py [auctions] [seed] [budget]
+"""
+
+import sys
+import random
+from collections import deque
+
+import fut.ratelimit
+from fut.config import fast_delay
+from fut.ratelimit import RateLimiter
+from fut.scheduler import Scheduler
+from fut.latency import LatencyEstimator
+from fut.bidwar import BidWar
+from fut.sniper import Sniper, priceStep
+
+BID_WINDOW = 60  # TradingBot.bidWindow
+REFRESH_INTERVAL = 300  # TradingBot.refreshInterval
+BUY_NOW_CHANCE = 0.02  # chance that one buy now search finds a bargain
+DELAY = 2  # delay between normal requests (middle of config.delay), RateLimiter can't wait on virtual clock
+RTT = 0.3  # mean round trip
+
+
+class Clock(object):
+    """Virtual time, also replaces time module in fut.ratelimit."""
+    def __init__(self):
+        self.now = 0.0
+
+    def monotonic(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.now += max(seconds, 0)
+
+
+class Auction(object):
+    def __init__(self, trade_id, deadline, price, our_max, their_max):
+        self.trade_id = trade_id
+        self.deadline = deadline
+        self.price = price
+        self.our_max = our_max
+        self.their_max = their_max
+        self.highest = 'them'  # we've been outbid already (that's why it's in watchlist)
+        self.responses = []  # times of competitor's responses
+
+    def closed(self, now):
+        return now >= self.deadline
+
+    def item(self, now):
+        return {'tradeId': self.trade_id, 'expires': max(self.deadline - now, -1),
+                'bidState': 'highest' if self.highest == 'us' else 'outbid',
+                'tradeState': 'closed' if self.closed(now) else 'active',
+                'currentBid': self.price, 'startingBid': 150}
+
+
+class Market(object):
+    """Auctions in our watchlist, competitor outbids us after random delay and snipes before the end."""
+    def __init__(self, count, seed, clock):
+        rnd = random.Random(seed)
+        self.rnd = random.Random(seed + 1)
+        self.clock = clock
+        self.actions = 0
+        self.wins = 0
+        self.buy_now_wins = 0
+        self.auctions = {}
+        for i in range(count):
+            our_max = rnd.randrange(1000, 5000, 100)
+            auction = Auction(i, rnd.uniform(120, 3 * 3600), our_max - rnd.randrange(200, 800, 100),
+                              our_max, int(our_max * rnd.uniform(0.7, 1.3)))
+            auction.responses.append(auction.deadline - rnd.uniform(0.5, 40))  # sniper
+            self.auctions[i] = auction
+        self.settled = set()
+
+    def __update(self):
+        """Let competitor act up to now."""
+        now = self.clock.now
+        for a in self.auctions.values():
+            for t in [t for t in a.responses if t <= min(now, a.deadline)]:
+                a.responses.remove(t)
+                if a.highest == 'us' and a.price + priceStep(a.price) <= a.their_max:
+                    a.price += priceStep(a.price)
+                    a.highest = 'them'
+            if a.closed(now) and a.trade_id not in self.settled:
+                self.settled.add(a.trade_id)
+                self.wins += a.highest == 'us'
+
+    def watchlist(self):
+        self.actions += 1
+        self.__update()
+        return [a.item(self.clock.now) for a in self.auctions.values()
+                if a.trade_id not in self.settled or a.closed(self.clock.now)]
+
+    def status(self, trade_ids):
+        """One trade/status request for given auctions."""
+        self.actions += 1
+        self.__update()
+        return [self.auctions[i].item(self.clock.now) for i in trade_ids]
+
+    def bid(self, trade_id, price=None):
+        """Bid (next increment by default). Returns False if it's too expensive (not sent) or too low."""
+        self.__update()
+        a = self.auctions[trade_id]
+        if a.highest == 'us' and price is None:
+            return True
+        if price is None:
+            price = a.price + priceStep(a.price)
+            if price > a.our_max:
+                return False
+        self.actions += 1
+        if a.closed(self.clock.now) or price <= a.price:
+            return False
+        a.price = price
+        a.highest = 'us'
+        if self.clock.now + 1 < a.deadline and self.rnd.random() < 0.7:
+            a.responses.append(self.rnd.uniform(self.clock.now + 1, min(self.clock.now + 120, a.deadline)))
+        return True
+
+    def buyNowSearch(self):
+        """Returns True if search found a bargain."""
+        self.actions += 1
+        return self.rnd.random() < BUY_NOW_CHANCE
+
+    def buyNow(self):
+        self.actions += 1
+        self.buy_now_wins += 1
+        return True
+
+    def finished(self):
+        self.__update()
+        return len(self.settled) == len(self.auctions)
+
+
+class Budget(object):
+    """Sliding window budget for the old loop (it waits for free slot)."""
+    def __init__(self, clock, budget):
+        self.clock = clock
+        self.budget = budget
+        self.history = deque()
+
+    def spend(self, count=1):
+        for _ in range(count):
+            while self.history and self.history[0] <= self.clock.now - 3600:
+                self.history.popleft()
+            if len(self.history) >= self.budget:
+                self.clock.now = self.history[0] + 3600
+                self.history.popleft()
+            self.history.append(self.clock.now)
+
+    def used(self):
+        while self.history and self.history[0] <= self.clock.now - 3600:
+            self.history.popleft()
+        return len(self.history)
+
+
+class Statuses(object):
+    def update(self, items):
+        pass
+
+
+class SimCore(object):
+    """Parts of Core used by TradingBot's loop, BidWar and Sniper.
+
+    Every request waits for its slot in a real RateLimiter (minimum gap and
+    hourly budget, reservations of scheduler's events included) and takes a
+    random round trip, which is measured into core.latency like Core does.
+    """
+    def __init__(self, market, clock, budget, seed):
+        self.market = market
+        self.clock = clock
+        self.rnd = random.Random(seed + 3)
+        self.limiter = RateLimiter(delay=(DELAY, DELAY), fast_delay=fast_delay, budget=budget)
+        self.latency = LatencyEstimator()
+        self.auctions = self  # deadline(), simulated deadlines are exact
+        self.statuses = Statuses()
+        self.credits = 10 ** 7
+        self.last_request_time = (None, None)
+        self.offers = 10 ** 6  # trade ids of buy now offers
+
+    def __request(self, endpoint, func, *args, fast=False):
+        reservation = getattr(self.limiter._local, 'reservation', None)
+        if reservation is not None and reservation.count > 0:  # budget is reserved, only gap applies
+            slot = self.limiter.last + (fast_delay if fast else DELAY)
+        else:
+            slot = self.limiter.nextSlot(fast=fast)
+        self.clock.now = max(self.clock.now, slot)
+        self.limiter.acquire(fast=fast)
+        sent = self.clock.now
+        rtt = self.rnd.uniform(0.5, 1.5) * RTT
+        self.clock.now += rtt / 2  # server handles request half way
+        rc = func(*args)
+        self.clock.now += rtt / 2
+        self.last_request_time = (sent, self.clock.now)
+        self.latency.record(endpoint, rtt)
+        return rc
+
+    def deadline(self, trade_id):
+        auction = self.market.auctions.get(trade_id)
+        return auction.deadline if auction else None
+
+    def watchlist(self):
+        return self.__request('watchlist', self.market.watchlist)
+
+    def tradeStatus(self, trade_ids, fast=False):
+        return self.__request('trade/status', self.market.status, trade_ids, fast=fast)
+
+    def bid(self, trade_id, bid, fast=False):
+        if trade_id >= 10 ** 6:
+            return self.__request('trade/bid', self.market.buyNow, fast=fast)
+        return self.__request('trade/bid', self.market.bid, trade_id, bid, fast=fast)
+
+    def search(self, ctype, assetId=None, min_price=None, min_buy=None, max_buy=None, fast=False):
+        if not self.__request('transfermarket', self.market.buyNowSearch, fast=fast):
+            return []
+        self.offers += 1
+        return [{'tradeId': self.offers, 'assetId': assetId, 'buyNowPrice': max_buy}]
+
+
+def before(count, seed, budget):
+    clock = Clock()
+    market = Market(count, seed, clock)
+    limit = Budget(clock, budget)
+    rnd = random.Random(seed + 2)
+
+    def act(func, *args):
+        before = market.actions
+        rc = func(*args)
+        limit.spend(market.actions - before)
+        clock.sleep(1.5)  # request time & delay
+        return rc
+
+    while not market.finished():
+        watchlist = sorted(act(market.watchlist), key=lambda i: i['expires'])
+        watchlist = [i for i in watchlist if i['tradeState'] != 'closed']
+        next_expire = watchlist[0]['expires'] if watchlist else 1000
+        if next_expire < 120:  # getAggressive
+            for x in watchlist:
+                if x['bidState'] == 'outbid':
+                    act(market.status, [x['tradeId']])
+                    act(market.bid, x['tradeId'])
+                    clock.sleep(rnd.randrange(1, 4))
+                if x['expires'] > 60:
+                    break
+        elif next_expire < 3000 and limit.used() < 300:  # buyNowMode
+            started = clock.now
+            while clock.now - started < min(next_expire - 50, 100):
+                if act(market.buyNowSearch):
+                    act(market.buyNow)
+                clock.sleep(rnd.randrange(1, 2))
+        else:  # watchListLoop
+            for x in watchlist:
+                if x['bidState'] == 'outbid' and x['expires'] < 3600:
+                    act(market.status, [x['tradeId']])
+                    act(market.bid, x['tradeId'])
+                    clock.sleep(rnd.randrange(1, 4))
+            clock.sleep(rnd.randrange(20, 40))
+        clock.sleep(rnd.randrange(1, 3))
+    return market, clock.now, None
+
+
+def after(count, seed, budget):
+    clock = Clock()
+    fut.ratelimit.time = clock  # limiter on virtual time
+    market = Market(count, seed, clock)
+    core = SimCore(market, clock, budget, seed)
+    scheduler = Scheduler(core.limiter, clock=clock.monotonic, sleep=clock.sleep)
+    bidwar = BidWar(core, scheduler, clock=clock.monotonic)
+    sniper = Sniper(core, {20801: 1000}, clock=clock.monotonic)
+
+    def finalWindow(x, event):  # TradingBot.finalWindow
+        bidwar.join(x, market.auctions[x['tradeId']].our_max)
+
+    def cycle(event):  # TradingBot.refresh, watchlist events simplified to state of each item
+        deadlines = []
+        for x in core.watchlist():
+            if x['tradeState'] == 'closed':
+                bidwar.settle(x['tradeId'], x['bidState'] == 'highest', x['currentBid'])
+                continue
+            deadline = core.auctions.deadline(x['tradeId'])
+            deadlines.append(deadline)
+            if scheduler.scheduled(x['tradeId']) is None and x['tradeId'] not in bidwar:
+                scheduler.at(deadline - BID_WINDOW, lambda e, x=x: finalWindow(x, e),
+                             key=x['tradeId'], deadline=deadline, cost=2)
+        next_cycle = min(deadlines + [clock.now + REFRESH_INTERVAL]) + 1
+        if not market.finished():
+            scheduler.at(next_cycle, cycle, key='cycle', cost=3)
+        next_window = min(deadlines) - BID_WINDOW if deadlines else next_cycle
+        if next_window - clock.now > 150 and core.limiter.used() < 300:  # buy now in idle time
+            sniper.run(clock.now + min(next_window - clock.now - 50, 100))
+
+    scheduler.at(0, cycle, key='cycle', cost=3)
+    scheduler.run(stop=market.finished)
+    return market, clock.now, bidwar.stats()
+
+
+def main(count=60, seed=0, budget=500):
+    print('%d auctions, budget %d requests/hour' % (count, budget))
+    for name, strategy in (('before (fixed sleeps)', before), ('after (scheduler)', after)):
+        market, duration, stats = strategy(count, seed, budget)
+        wins = market.wins + market.buy_now_wins
+        print('%-22s auctions won %3d, buy now %3d, actions %5d, wins/100 actions %5.2f, %.1fh'
+              % (name, market.wins, market.buy_now_wins, market.actions, 100.0 * wins / market.actions, duration / 3600))
+        if stats:
+            print('%-22s bid war: %d contested, %d won, %.1f actions per auction, lead %.1fs'
+                  % ('', stats['contested'], stats['won'], stats['actions_per_auction'] or 0, stats['lead']))
+
+
+if __name__ == '__main__':
+    main(*[int(i) for i in sys.argv[1:4]])
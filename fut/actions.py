@@ -0,0 +1,86 @@
+# -*- coding: utf-8 -*-
+
+"""
+fut.actions
+~~~~~~~~~~~~~~~~~~~~~
+
+This module implements the fut's action plan (batched watchlist cleanup and pile moves).
+
+"""
+
+from .exceptions import FutError
+from .log import logger
+
+
+class ActionPlan(object):
+    """Watchlist deletes and pile moves collected during one cycle and committed in batched requests.
+
+    Basic usage:
+
+        >>> plan = ActionPlan(session)
+        >>> plan.delete(lost['tradeId'])
+        >>> plan.move(won['id'], 'trade')
+        >>> plan.commit()
+        {'delete': {123: {'success': True, 'reason': None}}, 'trade': {456: {'success': True, 'reason': None}}}
+    """
+    def __init__(self, core):
+        self.core = core
+        self.deletes = []
+        self.moves = {}  # pile: [item ids]
+        self.logger = logger(__name__)
+
+    def __len__(self):
+        return len(self.deletes) + sum(len(i) for i in self.moves.values())
+
+    def delete(self, trade_id):
+        """Remove trade from watchlist on commit.
+
+        :params trade_id: Trade id.
+        """
+        if trade_id not in self.deletes:
+            self.deletes.append(trade_id)
+
+    def move(self, item_id, pile='trade'):
+        """Move item to pile on commit.
+
+        :params item_id: Item id.
+        :params pile: (optional) [trade/club] Pile.
+        """
+        items = self.moves.setdefault(pile, [])
+        if item_id not in items:
+            items.append(item_id)
+
+    def __commitMoves(self, pile, item_ids):
+        results = {}
+        if pile == 'trade':  # don't send more than tradepile can take
+            if self.core.piles.stale('tradepile'):
+                self.core.tradepile()
+            free = max(self.core.piles.free('tradepile'), 0)
+            for i in item_ids[free:]:
+                results[i] = {'success': False, 'reason': 'Tradepile full'}
+            item_ids = item_ids[:free]
+        if item_ids:
+            rc = self.core.moveItems(pile, item_ids)
+            for i in item_ids:
+                results[i] = {'success': rc[int(i)]['success'], 'reason': rc[int(i)].get('reason')}
+        return results
+
+    def commit(self):
+        """Send collected actions, one request per kind. Returns results {'delete'/pile: {id: {'success': bool, 'reason': str}}}."""
+        results = {}
+        if self.deletes:
+            try:
+                self.core.watchlistDelete(self.deletes)
+                results['delete'] = dict((i, {'success': True, 'reason': None}) for i in self.deletes)
+            except FutError as e:
+                self.logger.exception('Watchlist delete failed.')
+                results['delete'] = dict((i, {'success': False, 'reason': repr(e)}) for i in self.deletes)
+        for pile, item_ids in self.moves.items():
+            try:
+                results[pile] = self.__commitMoves(pile, item_ids)
+            except FutError as e:
+                self.logger.exception('Moving items to %s pile failed.' % pile)
+                results[pile] = dict((i, {'success': False, 'reason': repr(e)}) for i in item_ids)
+        self.deletes = []
+        self.moves = {}
+        return results
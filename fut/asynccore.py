@@ -0,0 +1,279 @@
+# -*- coding: utf-8 -*-
+
+"""
+fut.asynccore
+~~~~~~~~~~~~~~~~~~~~~
+
+This module implements the fut's asyncio client (market methods only).
+
+Basic usage:
+
+    >>> session = await fut.AsyncCore.login('email', 'password', 'secret_answer')
+    >>> items = await session.search('player', assetId=20801)
+    >>> await session.bid(items[0]['tradeId'], 600)
+    True
+    >>> await session.logout()
+
+"""
+
+import json
+import time
+import asyncio
+import functools
+try:
+    import aiohttp
+except ImportError:  # optional dependency, required only by AsyncCore
+    aiohttp = None
+
+from .core import Core, itemParse, requestPriority
+from .latency import endpointFamily
+from . import metrics
+from .log import logger
+from .ratelimit import AsyncRateLimiter
+from .exceptions import (FutError, ExpiredSession, UnknownError,
+                         PermissionDenied, Captcha, Conflict, MarketLocked)
+
+
+class AsyncCore(object):
+    """Asyncio version of Core's market methods.
+
+    Login (which is rare and long) is done by Core in executor, session is
+    then moved to aiohttp so every request/wait only suspends the coroutine.
+    """
+    def __init__(self, core, timeout=None):
+        if aiohttp is None:
+            raise FutError(reason='AsyncCore requires aiohttp (pip install aiohttp).')
+        self.core = core
+        self.pin = core.pin
+        self.sku_b = core.sku_b
+        self.fut_host = core.fut_host
+        self.tradepile_size = core.tradepile_size
+        self.watchlist_size = core.watchlist_size
+        self.piles = core.piles  # shared with Core
+        self.credits = core.credits
+        self.duplicates = []
+        self.latency = core.latency  # shared with Core
+        self.timeout = timeout or core.timeout
+        limiter = core.limiter
+        self.limiter = AsyncRateLimiter(delay=limiter.delay, fast_delay=limiter.fast_delay,
+                                        budget=limiter.budget, window=limiter.window)
+        self.limiter.history.extend(limiter.history)  # requests sent during login count too
+        self.limiter.last = limiter.last
+        self._ = core._
+        self.r = aiohttp.ClientSession(headers=dict(core.r.headers),
+                                       cookies=dict((c.name, c.value) for c in core.r.cookies),
+                                       timeout=aiohttp.ClientTimeout(total=self.timeout))
+        self.logger = logger(__name__)
+
+    @classmethod
+    async def login(cls, *args, **kwargs):
+        """Log in (arguments are the same as Core's) and return AsyncCore."""
+        loop = asyncio.get_event_loop()
+        core = await loop.run_in_executor(None, functools.partial(Core, *args, **kwargs))
+        return cls(core)
+
+    async def __request__(self, method, url, data=None, params=None, fast=False, priority=None):
+        """Prepare headers and sends request. Returns response as a json object.
+
+        :params method: Rest method.
+        :params url: Url.
+        :params priority: (optional) Priority class (fut.ratelimit.PRIORITY_*), guessed from url by default.
+        """
+        data = data or {}
+        params = params or {}
+        if priority is None:
+            priority = requestPriority(method, url)
+        endpoint = endpointFamily(url)
+        url = 'https://%s/ut/game/fifa18/%s' % (self.fut_host, url)
+
+        self.logger.debug("request: {0} data={1};  params={2}".format(url, data, params))
+        if method.upper() == 'GET':
+            params['_'] = self._  # only for get(?)
+            self._ += 1
+        params = dict((k, str(v)) for k, v in params.items())  # aiohttp accepts only strings
+        await self.limiter.acquire(fast=fast, priority=priority)  # respect minimum delay and requests budget
+        if not fast:
+            async with self.r.options(url, params=params):
+                pass
+        sent = time.monotonic()
+        async with self.r.request(method.upper(), url, data=data or None, params=params) as rc:
+            status = rc.status
+            content = await rc.text()
+        elapsed = time.monotonic() - sent
+        self.latency.record(endpoint, elapsed)
+        metrics.requests_sent.inc(endpoint=endpoint, status=status)
+        metrics.request_seconds.observe(elapsed, endpoint=endpoint)
+        self.logger.debug("response: {0}".format(content))
+        if not 200 <= status < 300:
+            if status == 401:
+                raise ExpiredSession()
+            elif status == 409:
+                raise Conflict()
+            elif status in (426, 429):
+                raise FutError('%s Too many requests' % status)
+            elif status == 458:
+                self.pin.send([self.pin.event('error')], block=False)
+                await self.logout()
+                raise Captcha()
+            elif status in (460, 461):
+                raise PermissionDenied(status)
+            elif status == 494:
+                raise MarketLocked()
+            elif status in (512, 521):
+                raise FutError('512/521 Temporary ban or just too many requests.')
+            raise UnknownError(content)
+        if content == '':
+            return {}
+        rc = json.loads(content)
+        if 'credits' in rc and rc['credits']:
+            self.credits = rc['credits']
+        if 'duplicateItemIdList' in rc:
+            self.duplicates = [i['itemId'] for i in rc['duplicateItemIdList']]
+        return rc
+
+    async def logout(self, save=True):
+        """Log out nicely and close http session.
+
+        :params save: False if You don't want to save cookies.
+        """
+        await self.r.close()
+        loop = asyncio.get_event_loop()
+        await loop.run_in_executor(None, functools.partial(self.core.logout, save=save))
+        return True
+
+    async def keepalive(self):
+        """Refresh credit amount to let know that we're still online. Returns credit amount."""
+        return (await self.__request__('GET', 'user/credits'))['credits']
+
+    async def search(self, ctype, level=None, category=None, assetId=None, defId=None,
+                     min_price=None, max_price=None, min_buy=None, max_buy=None,
+                     league=None, club=None, position=None, zone=None, nationality=None,
+                     rare=False, playStyle=None, start=0, page_size=36,
+                     fast=False):
+        """Prepare search request, send and return parsed data as a dict (see Core.search)."""
+        if start == 0:
+            self.pin.send([self.pin.event('page_view', 'Transfer Market Search')], fast=fast, block=False)
+
+        params = {'start': start,
+                  'num': page_size,
+                  'type': ctype}
+        for key, value in (('lev', level), ('cat', category), ('maskedDefId', assetId), ('definitionId', defId),
+                           ('micr', min_price), ('macr', max_price), ('minb', min_buy), ('maxb', max_buy),
+                           ('leag', league), ('team', club), ('pos', position), ('zone', zone),
+                           ('nat', nationality), ('playStyle', playStyle)):
+            if value:
+                params[key] = value
+        if rare:
+            params['rare'] = 'SP'
+
+        rc = await self.__request__('GET', 'transfermarket', params=params, fast=fast)
+
+        if start == 0:
+            self.pin.send([self.pin.event('page_view', 'Transfer Market Results - List View')], fast=fast, block=False)
+
+        return [itemParse(i) for i in rc.get('auctionInfo', ())]
+
+    async def bid(self, trade_id, bid, fast=False):
+        """Make a bid.
+
+        :params trade_id: Trade id.
+        :params bid: Amount of credits You want to spend.
+        :params fast: True for fastest bidding (skips trade status & credits check).
+        """
+        if not fast:
+            rc = await self.tradeStatus(trade_id)
+            # don't bid if trade has expired or current bid is equal or greater than our max bid
+            if not rc or rc[0]['currentBid'] >= bid or self.credits < bid:
+                return False
+        data = {'bid': bid}
+        try:
+            rc = (await self.__request__('PUT', 'trade/%s/bid' % trade_id, data=json.dumps(data),
+                                         params={'sku_b': self.sku_b}, fast=fast))['auctionInfo'][0]
+        except PermissionDenied:  # too slow, somebody took it already :-(
+            metrics.bids.inc(kind='bid', result='rejected')
+            return False
+        bought = rc['tradeState'] == 'closed' and rc['bidState'] == 'buyNow'
+        success = rc['bidState'] == 'highest' or bought
+        item_id = itemParse(rc, full=False)['id']
+        if bought:  # item waits in unassigned pile
+            self.piles.add('unassigned', item_id=item_id)
+        elif success:
+            self.piles.add('watchlist', item_id=item_id, trade_id=rc['tradeId'])
+        metrics.bids.inc(kind='buy_now' if bought else 'bid', result='success' if success else 'failed')
+        if bought:
+            metrics.coins_spent.inc(bid)
+        return success
+
+    async def tradeStatus(self, trade_id):
+        """Return trade status.
+
+        :params trade_id: Trade id.
+        """
+        if not isinstance(trade_id, (list, tuple)):
+            trade_id = (trade_id,)
+        params = {'tradeIds': ','.join(str(i) for i in trade_id)}
+        rc = await self.__request__('GET', 'trade/status', params=params)
+        return [itemParse(i, full=False) for i in rc['auctionInfo']]
+
+    async def tradepile(self):
+        """Return items in tradepile."""
+        rc = await self.__request__('GET', 'tradepile')
+        self.pin.send([self.pin.event('page_view', 'Transfer List - List View')], block=False)
+        items = [itemParse(i) for i in rc.get('auctionInfo', ())]
+        self.piles.sync('tradepile', items)
+        return items
+
+    async def watchlist(self):
+        """Return items in watchlist."""
+        rc = await self.__request__('GET', 'watchlist')
+        self.pin.send([self.pin.event('page_view', 'Transfer Targets - List View')], block=False)
+        items = [itemParse(i) for i in rc.get('auctionInfo', ())]
+        self.piles.sync('watchlist', items)
+        return items
+
+    async def sell(self, item_id, bid, buy_now, duration=3600, fast=False):
+        """Start auction. Returns trade_id.
+
+        :params item_id: Item id.
+        :params bid: Stard bid.
+        :params buy_now: Buy now price.
+        :params duration: Auction duration in seconds (Default: 3600).
+        """
+        data = {'buyNowPrice': buy_now, 'startingBid': bid, 'duration': duration, 'itemData': {'id': item_id}}
+        rc = await self.__request__('POST', 'auctionhouse', data=json.dumps(data), params={'sku_b': self.sku_b})
+        self.piles.add('tradepile', item_id=int(item_id), trade_id=rc['id'])
+        if not fast:  # tradeStatus check like webapp do
+            await self.tradeStatus(rc['id'])
+        return rc['id']
+
+    async def sendToTradepile(self, item_id, safe=True):
+        """Send to tradepile.
+
+        :params item_id: Item id.
+        :params safe: (optional) False to disable tradepile free space check.
+        """
+        if not isinstance(item_id, (list, tuple)):
+            item_id = (item_id,)
+        if safe:
+            if self.piles.stale('tradepile'):
+                await self.tradepile()  # resync, rare
+            if self.piles.free('tradepile') < len(item_id):
+                return False
+        data = {"itemData": [{'pile': 'trade', 'id': str(i)} for i in item_id]}
+        rc = await self.__request__('PUT', 'item', data=json.dumps(data))
+        self.piles.move([int(i['id']) for i in rc['itemData'] if i['success']], 'trade')
+        if not rc['itemData'][0]['success']:
+            self.logger.error("{0} NOT MOVED to trade Pile. REASON: {1}".format(item_id, rc['itemData'][0]['reason']))
+        return rc['itemData'][0]['success']
+
+    async def watchlistDelete(self, trade_id):
+        """Remove cards from watchlist.
+
+        :params trade_id: Trade id.
+        """
+        if not isinstance(trade_id, (list, tuple)):
+            trade_id = (trade_id,)
+        params = {'tradeId': ','.join(str(i) for i in trade_id)}
+        await self.__request__('DELETE', 'watchlist', params=params)  # returns nothing
+        self.piles.remove(trade_ids=[int(i) for i in trade_id])
+        return True
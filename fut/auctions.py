@@ -0,0 +1,154 @@
+# -*- coding: utf-8 -*-
+
+"""
+fut.auctions
+~~~~~~~~~~~~~~~~~~~~~
+
+This module implements the fut's auction tracker (absolute deadlines in a timer wheel).
+
+"""
+
+import math
+import time
+import threading
+
+from .config import auction_tick, auction_final
+
+
+class TimerWheel(object):
+    """Hierarchical timer wheel - O(1) insert, due timers are collected without scanning the rest.
+
+    Level 0 has `size` slots of `tick` seconds, every next level has `size`
+    slots covering whole previous level, timers are cascaded down as time goes.
+    """
+    def __init__(self, tick=1.0, size=64, levels=4, start=0):
+        self.tick = tick
+        self.size = size
+        self.levels = [[[] for _ in range(size)] for _ in range(levels)]
+        self.current = int(start // tick)  # current tick
+        self.overdue = []
+
+    def __len__(self):
+        return len(self.overdue) + sum(len(slot) for level in self.levels for slot in level)
+
+    def insert(self, when, value):
+        """Add timer.
+
+        :params when: Time (same clock as advance's now).
+        :params value: Returned by advance when timer is due.
+        """
+        t = int(math.ceil(when / self.tick))  # never fire early
+        delta = t - self.current
+        if delta <= 0:
+            self.overdue.append((when, value))
+            return
+        level = 0
+        while level < len(self.levels) - 1 and delta >= self.size ** (level + 1):
+            level += 1
+        self.levels[level][(t // self.size ** level) % self.size].append((when, value))
+
+    def advance(self, now):
+        """Move wheel to given time, returns values of due timers ordered by time.
+
+        :params now: Current time.
+        """
+        target = int(now // self.tick)
+        due, self.overdue = self.overdue, []
+        while self.current < target:
+            self.current += 1
+            for level in range(1, len(self.levels)):  # cascade higher levels when we cross their slot boundary
+                if self.current % self.size ** level:
+                    break
+                slot = (self.current // self.size ** level) % self.size
+                entries, self.levels[level][slot] = self.levels[level][slot], []
+                for when, value in entries:
+                    self.insert(when, value)
+            slot = self.current % self.size
+            due.extend(self.levels[0][slot])
+            self.levels[0][slot] = []
+            due.extend(self.overdue)
+            self.overdue = []
+        due.sort(key=lambda i: i[0])
+        return [value for when, value in due]
+
+
+class AuctionTracker(object):
+    """Absolute (monotonic) deadlines of tracked trades.
+
+    `expires` (seconds left) is converted to deadline on ingest using time
+    when request was sent and received, so it doesn't go stale between fetches.
+    poll() emits ('final_minute', trade_id, item) and ('expired', trade_id, item) events.
+    """
+    def __init__(self, final=auction_final, tick=auction_tick, clock=time.monotonic):
+        self.final = final
+        self.clock = clock
+        self.auctions = {}  # trade_id: [deadline, version, item]
+        self.wheel = TimerWheel(tick=tick, start=clock())
+        self._versions = 0
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self.auctions)
+
+    def __contains__(self, trade_id):
+        return trade_id in self.auctions
+
+    def ingest(self, items, sent=None, received=None):
+        """Track (or update) trades.
+
+        :params items: Parsed items (itemParse) with tradeId and expires.
+        :params sent: (optional) Monotonic time when request was sent.
+        :params received: (optional) Monotonic time when response was received.
+        """
+        now = self.clock()
+        # server computed `expires` somewhere between sent and received
+        base = ((sent or now) + (received or now)) / 2
+        with self._lock:
+            self.__ingest(items, base, now)
+
+    def __ingest(self, items, base, now):
+        for item in items:
+            trade_id = item.get('tradeId')
+            if not trade_id or item.get('expires') is None:
+                continue
+            deadline = base + max(item['expires'], 0)
+            record = self.auctions.get(trade_id)
+            if record is not None and abs(record[0] - deadline) < self.wheel.tick:  # timers are still valid
+                record[2] = item
+                continue
+            self._versions += 1
+            self.auctions[trade_id] = [deadline, self._versions, item]
+            if deadline - self.final > now:
+                self.wheel.insert(deadline - self.final, ('final_minute', trade_id, self._versions))
+            self.wheel.insert(deadline, ('expired', trade_id, self._versions))
+
+    def untrack(self, trade_id):
+        """Stop tracking trade (no more events).
+
+        :params trade_id: Trade id.
+        """
+        with self._lock:
+            self.auctions.pop(trade_id, None)
+
+    def deadline(self, trade_id):
+        """Return monotonic time when auction ends or None if it's not tracked."""
+        record = self.auctions.get(trade_id)
+        return record and record[0]
+
+    def remaining(self, trade_id):
+        """Return seconds left (like `expires` but always current) or None if trade is not tracked."""
+        record = self.auctions.get(trade_id)
+        return record and max(record[0] - self.clock(), 0)
+
+    def poll(self):
+        """Return events due since last poll: [(event, trade_id, item)], expired trades are untracked."""
+        events = []
+        with self._lock:
+            for event, trade_id, version in self.wheel.advance(self.clock()):
+                record = self.auctions.get(trade_id)
+                if record is None or record[1] != version:  # untracked or deadline changed
+                    continue
+                if event == 'expired':
+                    del self.auctions[trade_id]
+                events.append((event, trade_id, record[2]))
+        return events
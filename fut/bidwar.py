@@ -0,0 +1,201 @@
+# -*- coding: utf-8 -*-
+
+"""
+fut.bidwar
+~~~~~~~~~~~~~~~~~~~~~
+
+This module implements the fut's bid war engine (timed counter-bids in auction's final seconds).
+
+"""
+
+import time
+
+from .config import bidwar_margin, bidwar_batch
+from .log import logger
+from . import metrics
+from .tracing import traced
+from .sniper import priceStep
+
+default_rtt = 1.5  # pessimistic round trip (seconds) until Core has measured the endpoint
+
+
+def nextPrice(item):
+    """Return lowest valid bid on item."""
+    if not item['currentBid']:
+        return item['startingBid']
+    return item['currentBid'] + priceStep(item['currentBid'])
+
+
+class Contest(object):
+    """Auction we're fighting for."""
+    def __init__(self, item, max_price):
+        self.trade_id = item['tradeId']
+        self.item = item
+        self.max_price = max_price
+        self.start_price = nextPrice(item)  # what we'd pay without a war
+        self.bids = 0
+        self.actions = 0.0  # requests spent (batched status is shared)
+        self.gave_up = False
+        self.won = None
+        self.paid = None
+
+
+class BidWar(object):
+    """Auctions in their final window, counter-bids are timed from absolute deadline.
+
+    Auction is checked when it joins (too expensive ones are given up right
+    away) and again at `deadline - lead`, where lead covers status and bid
+    round trips measured by Core (core.latency), minimum delay between
+    requests and a safety margin. If we're outbid then, counter-bid is sent
+    immediately - late enough that other bidder has little time to answer.
+    After that auction is re-checked (and outbid again) as often as
+    requests budget allows while a counter-bid can still land before the
+    end. Checks due close to each other are sent as one trade/status request.
+
+    Results come from watchlist (settle), so they don't cost any requests.
+    """
+    def __init__(self, core, scheduler, margin=bidwar_margin, batch=bidwar_batch, clock=time.monotonic):
+        """:params core: Core.
+        :params scheduler: Scheduler running checks.
+        :params margin: (optional) Safety margin (seconds).
+        :params batch: (optional) Checks due within this many seconds are sent together.
+        :params clock: (optional) Monotonic clock.
+        """
+        self.core = core
+        self.scheduler = scheduler
+        self.margin = margin
+        self.batch = batch
+        self.clock = clock
+        self.contests = {}  # trade_id: Contest
+        self.settled = []
+        self.logger = logger(__name__)
+
+    def __contains__(self, trade_id):
+        return trade_id in self.contests
+
+    def lead(self):
+        """Return seconds before auction end when the final check has to be sent."""
+        latency = self.core.latency
+        return (latency.upper('trade/status', default_rtt) + self.core.limiter.fast_delay +
+                latency.upper('trade/bid', default_rtt) + self.margin)
+
+    def join(self, item, max_price):
+        """Start (or update) bid war on auction, it's checked right away.
+
+        :params item: Watchlist item.
+        :params max_price: Maximum bid.
+        """
+        contest = self.contests.get(item['tradeId'])
+        if contest is None:
+            contest = self.contests[item['tradeId']] = Contest(item, max_price)
+        contest.max_price = max_price
+        self.check([contest.trade_id])
+
+    def leave(self, trade_id):
+        """Stop fighting for auction (it's not counted in stats)."""
+        self.scheduler.cancel(trade_id)
+        self.contests.pop(trade_id, None)
+
+    def __deadline(self, contest):
+        return self.core.auctions.deadline(contest.trade_id)
+
+    def __schedule(self, contest, final=False):
+        """Schedule next check - at `deadline - lead`, or right away during the final seconds.
+
+        :params final: True if auction is in its final seconds already (it's checked again while our counter-bid can still land).
+        """
+        deadline = self.__deadline(contest)
+        if deadline is None or contest.gave_up:
+            return
+        lead = self.lead()
+        now = self.clock()
+        when = deadline - lead
+        if when <= now + self.batch:  # checked (batched) already
+            if not final:
+                return
+            when = now + self.core.limiter.fast_delay
+            if when + lead - self.margin > deadline:  # status + counter-bid wouldn't make it
+                return
+        self.scheduler.at(when, self.__due, key=contest.trade_id, deadline=deadline, cost=2)
+
+    def __due(self, event):
+        """Final check of auction, together with other auctions due soon."""
+        now = self.clock()
+        lead = self.lead()
+        trade_ids = [event.key]
+        for contest in self.contests.values():
+            deadline = self.__deadline(contest)
+            if contest.trade_id != event.key and not contest.gave_up and deadline and deadline - lead <= now + self.batch:
+                self.scheduler.cancel(contest.trade_id)
+                trade_ids.append(contest.trade_id)
+        self.check(trade_ids)
+
+    @traced('BidWar.check')
+    def check(self, trade_ids):
+        """Send one trade/status request for given auctions and counter-bid where we're outbid in final seconds.
+
+        :params trade_ids: Trade ids (joined already).
+        """
+        with metrics.mode('bid_war'):
+            self.__check(trade_ids)
+
+    def __check(self, trade_ids):
+        contests = [self.contests[i] for i in trade_ids if i in self.contests]
+        if not contests:
+            return
+        items = self.core.tradeStatus([c.trade_id for c in contests], fast=True)
+        self.core.statuses.update(items)
+        items = dict((i['tradeId'], i) for i in items)
+        for contest in sorted(contests, key=lambda c: self.__deadline(c) or 0):
+            contest.actions += 1.0 / len(contests)
+            item = items.get(contest.trade_id)
+            if item is None or item['tradeState'] == 'closed':
+                continue  # result comes with watchlist
+            contest.item = dict(contest.item, **item)
+            deadline = self.__deadline(contest)
+            if deadline is None:
+                continue
+            final = deadline - self.clock() <= self.lead() + self.batch
+            if item['bidState'] != 'highest' and (final or nextPrice(contest.item) > contest.max_price):
+                self.counter(contest)  # too expensive ones are given up right away
+            self.__schedule(contest, final=final)  # bid war goes on until the end
+
+    def counter(self, contest):
+        """Outbid other bidder now (unless it's over max price)."""
+        price = nextPrice(contest.item)
+        if price > contest.max_price or price > self.core.credits:
+            self.logger.info('bid war on %s given up at %s (max %s)' % (contest.trade_id, price, contest.max_price))
+            contest.gave_up = True
+            return False
+        success = self.core.bid(contest.trade_id, price, fast=True)  # status is fresh already
+        contest.bids += 1
+        contest.actions += 1
+        self.logger.info('bid war on %s: %s %s, %.1fs left' % (contest.trade_id, 'bid' if success else 'failed bid', price,
+                                                               (self.__deadline(contest) or 0) - self.clock()))
+        return success
+
+    def settle(self, trade_id, won, price=None):
+        """Record result of auction (from watchlist).
+
+        :params trade_id: Trade id.
+        :params won: True if auction was won.
+        :params price: (optional) Final price.
+        """
+        contest = self.contests.pop(trade_id, None)
+        if contest is None:
+            return
+        self.scheduler.cancel(trade_id)
+        contest.won = won
+        contest.paid = price if won else None
+        self.settled.append(contest)
+
+    def stats(self):
+        """Return contested auctions, win rate, coins overpaid (paid over price at join) and requests per auction."""
+        won = [c for c in self.settled if c.won]
+        count = len(self.settled)
+        return {'contested': count,
+                'won': len(won),
+                'win_rate': float(len(won)) / count if count else None,
+                'overpaid': sum(max(c.paid - c.start_price, 0) for c in won if c.paid),
+                'actions_per_auction': sum(c.actions for c in self.settled) / count if count else None,
+                'lead': self.lead()}
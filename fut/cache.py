@@ -0,0 +1,71 @@
+# -*- coding: utf-8 -*-
+
+"""
+fut.cache
+~~~~~~~~~~~~~~~~~~~~~
+
+This module implements the fut's on-disk cache (config, databases etc.).
+
+"""
+
+import os
+import json
+import time
+import tempfile
+
+from .config import cache_dir
+
+
+def path(name):
+    """Return full path of cache entry.
+
+    :params name: Cache entry (file) name.
+    """
+    return os.path.join(cache_dir, name)
+
+
+def atomicWrite(file_path, content, mode='w'):
+    """Write file so readers never see partially written content.
+
+    :params file_path: Destination path.
+    :params content: File content (str or bytes depending on mode).
+    :params mode: (optional) 'w' for text, 'wb' for binary content.
+    """
+    directory = os.path.dirname(os.path.abspath(file_path))
+    if not os.path.isdir(directory):
+        os.makedirs(directory)
+    fd, tmp = tempfile.mkstemp(dir=directory, prefix='.%s.' % os.path.basename(file_path))
+    try:
+        with os.fdopen(fd, mode) as f:
+            f.write(content)
+        os.replace(tmp, file_path)
+    except BaseException:
+        os.remove(tmp)
+        raise
+
+
+def load(name):
+    """Return (data, age in seconds) of cache entry or (None, None) if there is no (valid) entry.
+
+    :params name: Cache entry name.
+    """
+    try:
+        with open(path(name), 'r') as f:
+            data = json.load(f)
+        age = time.time() - os.path.getmtime(path(name))
+    except (IOError, OSError, ValueError):
+        return None, None
+    return data, age
+
+
+def save(name, data):
+    """Save cache entry. Errors are not fatal - it's only a cache.
+
+    :params name: Cache entry name.
+    :params data: Json serializable data.
+    """
+    try:
+        atomicWrite(path(name), json.dumps(data))
+    except (IOError, OSError):
+        return False
+    return True
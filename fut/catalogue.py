@@ -0,0 +1,382 @@
+# -*- coding: utf-8 -*-
+
+"""
+fut.catalogue
+~~~~~~~~~~~~~~~~~~~~~
+
+This module implements the fut's players database (players.json) cache.
+
+"""
+
+import os
+import re
+import time
+import mmap
+import bisect
+import struct
+import threading
+import unicodedata
+from array import array
+try:
+    from collections.abc import Mapping
+except ImportError:  # python2
+    from collections import Mapping
+
+import requests
+
+from . import cache
+from .config import timeout, players_ttl
+from .log import logger
+from .urls import card_info_url
+
+# players.bin layout (native byte order, it's a per host cache):
+#   header: magic, version, hash table bits, rows count
+#   uint32 hash table [2**bits] (row + 1, 0 means empty slot)
+#   uint32 ids [count]
+#   uint32 string offsets [3 * count + 1] (first name, last name, common name of every row)
+#   uint16 nationality [count]
+#   uint8 rating [count]
+#   uint8 legend flag [count]
+#   utf-8 strings
+_header = struct.Struct('<4sHHI4x')
+_magic = b'FUTP'
+version = 1
+
+
+def _slot(player_id, bits):
+    """Fibonacci hashing - returns hash table slot of player id."""
+    return ((player_id * 2654435761) & 0xffffffff) >> (32 - bits)
+
+
+def build(data):
+    """Convert players.json to compact players.bin format. Returns bytes.
+
+    :params data: Parsed players.json ({'Players': [...], 'LegendsPlayers': [...]}).
+    """
+    rows = {}
+    for legend, key in ((0, 'Players'), (1, 'LegendsPlayers')):
+        for i in data.get(key, []):
+            rows.pop(i['id'], None)  # keep order of the last occurrence
+            rows[i['id']] = (i, legend)
+    count = len(rows)
+    bits = 1
+    while 2 ** bits < count * 2:  # load factor <= .5
+        bits += 1
+    mask = 2 ** bits - 1
+
+    table = array('I', [0]) * (mask + 1)
+    ids, offsets = array('I'), array('I', [0])
+    nations, ratings, legends = array('H'), array('B'), array('B')
+    strings = bytearray()
+    for n, (i, legend) in enumerate(rows.values()):
+        ids.append(i['id'])
+        nations.append(i['n'])
+        ratings.append(i['r'])
+        legends.append(legend)
+        for k in ('f', 'l', 'c'):
+            strings += (i.get(k) or '').encode('utf-8')
+            offsets.append(len(strings))
+        slot = _slot(i['id'], bits)
+        while table[slot]:
+            slot = (slot + 1) & mask
+        table[slot] = n + 1
+
+    return b''.join((_header.pack(_magic, version, bits, count),
+                     table.tobytes(), ids.tobytes(), offsets.tobytes(),
+                     nations.tobytes(), ratings.tobytes(), legends.tobytes(),
+                     bytes(strings)))
+
+
+class MappedCatalogue(Mapping):
+    """Read-only {id: player} mapping over players.bin content.
+
+    Used with mmap so all processes on the host share the same pages and
+    nothing is parsed per process - lookups read columns directly.
+    """
+    def __init__(self, buf):
+        self._buf = buf  # keep mmap alive
+        magic, ver, self._bits, self._count = _header.unpack_from(buf)
+        if magic != _magic or ver != version:
+            raise ValueError('Unsupported players database format.')
+        mv = self._mv = memoryview(buf)
+        pos = [_header.size]
+
+        def column(fmt, length):
+            size = struct.calcsize(fmt) * length
+            col = mv[pos[0]:pos[0] + size].cast(fmt)
+            pos[0] += size
+            return col
+        self._table = column('I', 2 ** self._bits)
+        self._ids = column('I', self._count)
+        self._offsets = column('I', 3 * self._count + 1)
+        self._nations = column('H', self._count)
+        self._ratings = column('B', self._count)
+        self._legends = column('B', self._count)
+        self._strings = mv[pos[0]:]
+        self._mask = 2 ** self._bits - 1
+
+    @classmethod
+    def open(cls, file_path):
+        """Map players.bin file read-only."""
+        with open(file_path, 'rb') as f:
+            return cls(mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ))
+
+    def close(self):
+        """Release mapped file, catalogue can't be used afterwards."""
+        for view in (self._table, self._ids, self._offsets, self._nations, self._ratings, self._legends,
+                     self._strings, self._mv):
+            view.release()
+        if isinstance(self._buf, mmap.mmap):
+            try:
+                self._buf.close()
+            except BufferError:  # somebody still holds a view, mapping is released with it
+                pass
+
+    def _row(self, player_id):
+        slot = _slot(player_id, self._bits)
+        while True:
+            n = self._table[slot]
+            if not n:
+                return None
+            if self._ids[n - 1] == player_id:
+                return n - 1
+            slot = (slot + 1) & self._mask
+
+    def _string(self, n, k):
+        start, end = self._offsets[3 * n + k], self._offsets[3 * n + k + 1]
+        return self._strings[start:end].tobytes().decode('utf-8')
+
+    def _player(self, n):
+        return {'id': self._ids[n],
+                'firstname': self._string(n, 0),
+                'lastname': self._string(n, 1),
+                'surname': self._string(n, 2) or None,
+                'rating': self._ratings[n],
+                'nationality': self._nations[n]}  # replace with nationality object when created
+
+    def __getitem__(self, player_id):
+        n = self._row(player_id) if isinstance(player_id, int) else None
+        if n is None:
+            raise KeyError(player_id)
+        return self._player(n)
+
+    def __contains__(self, player_id):
+        return isinstance(player_id, int) and self._row(player_id) is not None
+
+    def __iter__(self):
+        return iter(self._ids)
+
+    def __len__(self):
+        return self._count
+
+    def name(self, player_id):
+        """Return player display name without building player dict."""
+        n = self._row(player_id)
+        if n is None:
+            return None
+        return self._string(n, 2) or '%s %s' % (self._string(n, 0), self._string(n, 1))
+
+    def raw(self):
+        """Return players in players.json format."""
+        rc = {'Players': [], 'LegendsPlayers': []}
+        for n in range(self._count):
+            entry = {'id': self._ids[n], 'f': self._string(n, 0), 'l': self._string(n, 1),
+                     'r': self._ratings[n], 'n': self._nations[n]}
+            if self._string(n, 2):
+                entry['c'] = self._string(n, 2)
+            rc['LegendsPlayers' if self._legends[n] else 'Players'].append(entry)
+        return rc
+
+
+class PlayerCatalogue(object):
+    """Players database downloaded once and kept as an index {id: player}.
+
+    Database is converted to players.bin in cache directory and memory-mapped,
+    other processes map the same file instead of downloading it again.
+    It's refreshed on first access after ttl seconds.
+    """
+    def __init__(self, url=None, ttl=players_ttl, timeout=timeout, file_path=None):
+        self.url = url or '{0}{1}.json'.format(card_info_url, 'players')
+        self.ttl = ttl
+        self.timeout = timeout
+        self.file_path = file_path or cache.path('players.bin')
+        self.loaded_at = None
+        self._raw = None
+        self._players = {}
+        self._index = None
+        self._lock = threading.Lock()
+        self.logger = logger(__name__)
+
+    def __fetch(self, timeout=None):
+        return requests.get(self.url, timeout=timeout or self.timeout).json()
+
+    def __use(self, players, loaded_at):
+        # old catalogue isn't closed - callers may still hold it (core.players), it's unmapped when last of them drops it
+        self._players = players
+        self._raw = None  # rebuilt on demand
+        self._index = None  # rebuilt on next search
+        self.loaded_at = loaded_at
+
+    def load(self, data):
+        """Build index from raw players.json data (without saving it).
+
+        :params data: Parsed players.json ({'Players': [...], 'LegendsPlayers': [...]}).
+        """
+        self.__use(MappedCatalogue(build(data)), time.time())
+
+    def expired(self):
+        """Return True if database was never loaded or ttl has passed."""
+        return self.loaded_at is None or (self.ttl is not None and time.time() - self.loaded_at > self.ttl)
+
+    def __loadFile(self):
+        try:
+            players = MappedCatalogue.open(self.file_path)
+            loaded_at = os.path.getmtime(self.file_path)
+        except (IOError, OSError, ValueError, struct.error):
+            return False
+        self.__use(players, loaded_at)
+        return True
+
+    def refresh(self, timeout=None):
+        """Download players database, save it as players.bin and map it."""
+        with self._lock:
+            try:
+                blob = build(self.__fetch(timeout=timeout))
+            except (requests.RequestException, ValueError):
+                if self.loaded_at is None:
+                    raise
+                # keep serving old data, we'll try again after next ttl
+                self.logger.exception('Unable to refresh players database.')
+                self.loaded_at = time.time()
+                return
+            try:
+                cache.atomicWrite(self.file_path, blob, mode='wb')
+            except (IOError, OSError):  # e.g. mapped file can't be replaced on windows
+                self.logger.exception('Unable to save players database.')
+                self.__use(MappedCatalogue(blob), time.time())  # old file would look expired again
+                return
+            if not self.__loadFile():
+                self.__use(MappedCatalogue(blob), time.time())
+
+    def __ensure(self, timeout=None):
+        if self.loaded_at is None:
+            with self._lock:
+                if self.loaded_at is None:
+                    self.__loadFile()  # another process might have already built it
+        if self.expired():
+            self.refresh(timeout=timeout)
+
+    def raw(self, timeout=None):
+        """Return raw players.json data."""
+        self.__ensure(timeout=timeout)
+        if self._raw is None:
+            self._raw = self._players.raw()
+        return self._raw
+
+    def players(self, timeout=None):
+        """Return all players in read-only dict {id: c, f, l, n, r}."""
+        self.__ensure(timeout=timeout)
+        return self._players
+
+    def get(self, player_id, default=None):
+        """Return player by id.
+
+        :params player_id: Player (base) id.
+        """
+        return self.players().get(player_id, default)
+
+    def name(self, player_id):
+        """Return player display name - common name if available, first + last name otherwise.
+
+        :params player_id: Player (base) id.
+        """
+        return self.players().name(player_id)
+
+    def search(self, query, limit=None):
+        """Return raw players.json entries matching query, best rated first.
+
+        :params query: Part of common, first or last name (case and accent insensitive).
+        :params limit: (optional) Maximum number of results.
+        """
+        return self.index().search(query, limit=limit)
+
+    def index(self, timeout=None):
+        """Return search index, database is loaded and index built on first use."""
+        self.__ensure(timeout=timeout)
+        index = self._index
+        if index is None:
+            index = self._index = PlayerSearchIndex(i for t in self.raw().values() for i in t)
+        return index
+
+    def ready(self):
+        """Return True if search can be answered without downloading database or building index."""
+        return self._index is not None and not self.expired()
+
+
+class PlayerSearchIndex(object):
+    """Search index over common, first and last names of raw players.json entries.
+
+    Words shorter than 3 chars are looked up by token prefix, longer ones by
+    trigrams (so they match anywhere in the name like the old substring scan).
+    """
+    def __init__(self, entries):
+        # entries are ordered by rating so candidates can be ranked by position
+        self.entries = sorted(entries, key=lambda i: (-i['r'], i['id']))
+        self.names = []
+        self.trigrams = {}
+        tokens = []
+        for n, entry in enumerate(self.entries):
+            name = ' '.join(fold(entry[k]) for k in ('c', 'f', 'l') if entry.get(k))
+            self.names.append(name)
+            for token in set(_word.findall(name)):
+                tokens.append((token, n))
+            for trigram in set(name[i:i + 3] for i in range(len(name) - 2)):
+                self.trigrams.setdefault(trigram, []).append(n)
+        tokens.sort()
+        self.tokens = [i[0] for i in tokens]
+        self.token_entries = [i[1] for i in tokens]
+
+    def __prefix(self, word):
+        start = bisect.bisect_left(self.tokens, word)
+        end = bisect.bisect_left(self.tokens, word + u'\uffff', start)
+        return set(self.token_entries[start:end])
+
+    def __substring(self, word):
+        postings = [self.trigrams.get(word[i:i + 3], ()) for i in range(len(word) - 2)]
+        postings.sort(key=len)
+        candidates = set(postings[0])
+        for p in postings[1:]:
+            candidates.intersection_update(p)
+            if not candidates:
+                break
+        return set(n for n in candidates if word in self.names[n])
+
+    def search(self, query, limit=None):
+        """Return entries matching every word of query, best rated first.
+
+        :params query: Search phrase.
+        :params limit: (optional) Maximum number of results.
+        """
+        words = _word.findall(fold(query))
+        if not words:
+            return []
+        matches = None
+        for word in sorted(words, key=len, reverse=True):  # longest (most selective) first
+            found = self.__substring(word) if len(word) >= 3 else self.__prefix(word)
+            matches = found if matches is None else matches & found
+            if not matches:
+                return []
+        return [self.entries[n] for n in sorted(matches)[:limit]]
+
+
+_word = re.compile(r'\w+', re.UNICODE)
+
+
+def fold(text):
+    """Return lowercase text without accents (Müller -> muller)."""
+    text = unicodedata.normalize('NFKD', text)
+    return u''.join(c for c in text if not unicodedata.combining(c)).lower()
+
+
+# shared by all Core instances (and apps) in current process
+catalogue = PlayerCatalogue()
@@ -1,3 +1,5 @@
+import os
+
 # chrome 58 @ win10
 headers = {
     'User-Agent': 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/61.0.3163.100 Safari/537.36',
@@ -39,5 +41,28 @@ headers_ios = {
 
 cookies_file = 'cookies.txt'
 token_file = 'token.txt'
+snapshot_file = 'session.json'  # logged in session (sid etc.) resumed by next process
 timeout = 15  # defaulf global timeout
 delay = (1, 3)  # default mininum delay between requests (random range)
+fast_delay = 1.4  # minimum delay between fast requests
+budget_window = 3600  # requests budget (Core's budget param) is counted per this many seconds
+players_ttl = 24 * 3600  # how long (in seconds) players database is considered fresh
+cache_dir = os.path.join(os.path.expanduser('~'), '.fut')  # on-disk cache shared by all sessions on this host
+config_ttl = 24 * 3600  # web-app config.json
+remote_config_ttl = 5 * 60  # remoteConfig.json (maintenance flag etc.)
+messages_ttl = 24 * 3600  # nations, leagues, teams etc. (en_US.json)
+pin_ttl = 3600  # pinEvents constants (from web-app js), revalidated after ttl
+session_flush_interval = 30  # cookies & token are written to disk at most every this many seconds (and on login/logout)
+credits_ttl = 5 * 60  # credits derived from responses are resynced (keepalive) after this many seconds
+trade_status_window = 0.05  # trade status requests made within this many seconds are sent together
+trade_status_ttl = 10  # cached trade status (from search, watchlist etc.) is good enough for bid checks for this many seconds
+trade_status_batch = 50  # maximum trade ids in one trade/status request
+piles_ttl = 15 * 60  # locally tracked tradepile/watchlist/unassigned content is resynced after this many seconds
+auction_tick = 1.0  # resolution (seconds) of auction deadlines timer wheel
+auction_final = 60  # 'final_minute' event is emitted this many seconds before auction end
+latency_window = 256  # round trips per endpoint family kept for percentiles
+latency_alpha = 0.125  # weight of new sample in smoothed (ewma) round trip
+bidwar_margin = 0.5  # safety margin (seconds) on top of measured round trips when timing final counter-bid
+bidwar_batch = 3  # bid war checks due within this many seconds are sent as one trade/status request
+trace_sample_rate = 0.05  # fraction of traces (bot cycles, standalone Core calls) recorded by fut.tracing, 0 disables it
+snipe_variants = 9  # buy now searches of one asset rotate through this many min price / min buy now values (cache busting)
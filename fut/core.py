@@ -10,7 +10,6 @@ This module implements the fut's basic methods.
 
 import requests
 import re
-import random
 import time
 import json
 import pyotp
@@ -29,9 +28,22 @@ except NameError:
     FileNotFoundError = IOError
 
 from .pin import Pin
-from .config import headers, headers_and, headers_ios, cookies_file, token_file, timeout, delay
+from .credits import CreditTracker
+from .tradestatus import TradeStatus
+from .piles import Piles
+from .auctions import AuctionTracker
+from .latency import LatencyEstimator, endpointFamily
+from .session import SessionStore, accountPaths
+from .config import headers, headers_and, headers_ios, cookies_file, token_file, snapshot_file, timeout, delay
 from .log import logger
-from .urls import client_id, auth_url, card_info_url, messages_url, fun_captcha_public_key
+from .ratelimit import (RateLimiter, PRIORITY_BID, PRIORITY_TRADE_STATUS,
+                        PRIORITY_PILES, PRIORITY_SEARCH)
+from .catalogue import catalogue
+from .localization import localization
+from . import urls
+from . import metrics
+from .tracing import traceMethods
+from .urls import card_info_url
 from .exceptions import (FutError, ExpiredSession, InternalServerError,
                          UnknownError, PermissionDenied, Captcha,
                          Conflict, MaxSessions, MultipleSession,
@@ -196,21 +208,13 @@ def itemParse(item_data, full=True):
 #     return requests.get(url, timeout=timeout).json()
 
 
-# TODO: optimize messages (parse whole messages once!), xml parser might be faster
 # TODO: parse more data (short club names etc.)
 def nations(timeout=timeout):
     """Return all nations in dict {id0: nation0, id1: nation1}.
 
     :params year: Year.
     """
-    rc = requests.get(messages_url, timeout=timeout)
-    rc.encoding = 'utf-8'  # guessing takes huge amount of cpu time
-    rc = rc.text
-    data = re.findall('"search.nationName.nation([0-9]+)": "(.+)"', rc)
-    nations = {}
-    for i in data:
-        nations[int(i[0])] = i[1]
-    return nations
+    return localization.get('nations', timeout=timeout)
 
 
 def leagues(year=2018, timeout=timeout):
@@ -218,14 +222,7 @@ def leagues(year=2018, timeout=timeout):
 
     :params year: Year.
     """
-    rc = requests.get(messages_url, timeout=timeout)
-    rc.encoding = 'utf-8'  # guessing takes huge amount of cpu time
-    rc = rc.text
-    data = re.findall('"global.leagueFull.%s.league([0-9]+)": "(.+)"' % year, rc)
-    leagues = {}
-    for i in data:
-        leagues[int(i[0])] = i[1]
-    return leagues
+    return localization.get('leagues', year, timeout=timeout)
 
 
 def teams(year=2018, timeout=timeout):
@@ -233,14 +230,7 @@ def teams(year=2018, timeout=timeout):
 
     :params year: Year.
     """
-    rc = requests.get(messages_url, timeout=timeout)
-    rc.encoding = 'utf-8'  # guessing takes huge amount of cpu time
-    rc = rc.text
-    data = re.findall('"global.teamFull.%s.team([0-9]+)": "(.+)"' % year, rc)
-    teams = {}
-    for i in data:
-        teams[int(i[0])] = i[1]
-    return teams
+    return localization.get('teams', year, timeout=timeout)
 
 
 def stadiums(year=2018, timeout=timeout):
@@ -248,42 +238,19 @@ def stadiums(year=2018, timeout=timeout):
 
     :params year: Year.
     """
-    rc = requests.get(messages_url, timeout=timeout)
-    rc.encoding = 'utf-8'  # guessing takes huge amount of cpu time
-    rc = rc.text
-    data = re.findall('"global.stadiumFull.%s.stadium([0-9]+)": "(.+)"' % year, rc)
-    stadiums = {}
-    for i in data:
-        stadiums[int(i[0])] = i[1]
-    return stadiums
+    return localization.get('stadiums', year, timeout=timeout)
 
 
 def balls(timeout=timeout):
     """Return all balls in dict {id0: ball0, id1: ball1}."""
-    rc = requests.get(messages_url, timeout=timeout)
-    rc.encoding = 'utf-8'  # guessing takes huge amount of cpu time
-    rc = rc.text
-    data = re.findall('"BallName_([0-9]+)": "(.+)"', rc)
-    balls = {}
-    for i in data:
-        balls[int(i[0])] = i[1]
-    return balls
+    return localization.get('balls', timeout=timeout)
 
 
 def players(timeout=timeout):
     """Return all players in dict {id: c, f, l, n, r}.
     id, rank, nationality(?), first name, last name.
     """
-    rc = requests.get('{0}{1}.json'.format(card_info_url, 'players'), timeout=timeout).json()
-    players = {}
-    for i in rc['Players'] + rc['LegendsPlayers']:
-        players[i['id']] = {'id': i['id'],
-                            'firstname': i['f'],
-                            'lastname': i['l'],
-                            'surname': i.get('c'),
-                            'rating': i['r'],
-                            'nationality': i['n']}  # replace with nationality object when created
-    return players
+    return catalogue.players(timeout=timeout)
 
 
 def playstyles(year=2018, timeout=timeout):
@@ -291,43 +258,115 @@ def playstyles(year=2018, timeout=timeout):
 
     :params year: Year.
     """
-    rc = requests.get(messages_url, timeout=timeout)
-    rc.encoding = 'utf-8'  # guessing takes huge amount of cpu time
-    rc = rc.text
-    data = re.findall('"playstyles.%s.playstyle([0-9]+)": "(.+)"' % year, rc)
-    playstyles = {}
-    for i in data:
-        playstyles[int(i[0])] = i[1]
-    return playstyles
+    return localization.get('playstyles', year, timeout=timeout)
 
 
+def requestPriority(method, url):
+    """Return priority class of request - bids first, telemetry last.
+
+    :params method: Rest method.
+    :params url: Url (relative to /ut/game/fifa18/).
+    """
+    if url.startswith('trade/') and url.endswith('/bid'):
+        return PRIORITY_BID
+    elif url == 'trade/status':
+        return PRIORITY_TRADE_STATUS
+    elif url == 'transfermarket':
+        return PRIORITY_SEARCH
+    return PRIORITY_PILES
+
+
+# attributes of logged in session saved in snapshot (see Core.snapshot and Core.__resume__)
+snapshot_keys = ('access_token', 'token_type', 'nucleus_id', 'dob', 'persona_id', 'fut_host', 'sid', 'token',
+                 'emulate', 'sku', 'sku_b', 'tradepile_size', 'watchlist_size', '_usermassinfo')
+
+
+@traceMethods
 class Core(object):
-    def __init__(self, email, passwd, secret_answer, platform='pc', code=None, totp=None, sms=False, emulate=None, debug=False, cookies=cookies_file, token=token_file, timeout=timeout, delay=delay, proxies=None, anticaptcha_client_key=None):
-        self.credits = 0
+    def __init__(self, email, passwd, secret_answer, platform='pc', code=None, totp=None, sms=False, emulate=None, debug=False, cookies=cookies_file, token=token_file, snapshot=snapshot_file, timeout=timeout, delay=delay, budget=None, proxies=None, anticaptcha_client_key=None, session_dir=None):
+        self.credit_tracker = CreditTracker()
+        self.statuses = TradeStatus(self.tradeStatus)  # batched & cached trade statuses (bid checks)
+        self.auctions = AuctionTracker()  # absolute deadlines of watched trades
+        self.last_request_time = (None, None)  # (sent, received) monotonic times of last request
+        self.latency = LatencyEstimator()  # round trips per endpoint family (trade/bid, transfermarket etc.)
         self.duplicates = []
+        if session_dir:  # separate files for every account
+            cookies, token, snapshot = accountPaths(email, session_dir)
         self.cookies_file = cookies  # TODO: map self.cookies to requests.Session.cookies?
         self.token_file = token
+        self.session_store = SessionStore(cookies, token, snapshot_file=snapshot) if cookies else None  # write-behind cookies & token
         self.timeout = timeout
         self.delay = delay
-        self.request_time = 0
+        self.limiter = RateLimiter(delay=delay, budget=budget)  # budget - max requests per hour (None = unlimited)
+        self.account = email.lower()  # metrics label
+        metrics.budget_used.setFunction(self.limiter.used, account=self.account)
+        metrics.budget_remaining.setFunction(self.limiter.remaining, account=self.account)
         # db
-        self._players = None
-        self._playstyles = None
-        self._nations = None
-        self._stadiums = None
-        self._leagues = {}
-        self._teams = {}
         self._usermassinfo = {}
         logger(save=debug)  # init root logger
         self.logger = logger(__name__)
         # TODO: validate fut request response (200 OK)
-        self.__launch__(email, passwd, secret_answer, platform=platform, code=code, totp=totp, sms=sms, emulate=emulate, proxies=proxies, anticaptcha_client_key=anticaptcha_client_key)
+        self.started = time.monotonic()
+        self.time_to_first_search = None
+        self.resumed = False
+        saved = self.session_store and self.session_store.loadSnapshot(email=email.lower(), platform=platform, emulate=emulate)
+        if saved:
+            try:
+                self.__resume__(saved, proxies=proxies)
+                self.resumed = True
+            except ExpiredSession:
+                self.logger.info('Saved session expired, logging in.')
+                self.session_store.dropSnapshot()
+        if not self.resumed:
+            self.__launch__(email, passwd, secret_answer, platform=platform, code=code, totp=totp, sms=sms, emulate=emulate, proxies=proxies, anticaptcha_client_key=anticaptcha_client_key)
+        self.piles = Piles(self.tradepile_size, self.watchlist_size)  # pile occupancy tracked locally
+        if not self.resumed:  # usermassinfo in snapshot might be outdated
+            self.piles.seed(self._usermassinfo)
+
+    def __resume__(self, snapshot, proxies=None):
+        """Resume session saved by previous process, validated by one cheap request instead of full launch.
+
+        :params snapshot: Snapshot loaded by SessionStore (see Core.snapshot).
+        :params proxies: (optional) [dict] http/socks proxies in requests's format.
+        """
+        urls.checkRemoteConfig()  # futweb maintenance etc.
+        self.r = requests.Session()
+        if proxies is not None:
+            self.r.proxies = proxies
+        self.r.cookies = LWPCookieJar(self.cookies_file)
+        try:
+            self.r.cookies.load(ignore_discard=True)
+        except IOError:
+            pass
+        self.r.headers = dict(snapshot['headers'])  # X-UT-SID, X-UT-PHISHING-TOKEN etc.
+        for key in snapshot_keys:
+            setattr(self, key, snapshot[key])
+        self._ = int(time.time() * 1000)
+        self.pin = Pin(sid=self.sid, nucleus_id=self.nucleus_id, persona_id=self.persona_id, dob=self.dob[:-3], platform=snapshot['platform'], limiter=self.limiter)
+        try:
+            self.keepalive()  # validates sid, raises ExpiredSession (401) otherwise
+        except ExpiredSession:
+            self.pin.close()
+            for key in snapshot_keys:  # full launch starts from scratch
+                delattr(self, key)
+            raise
+        self.logger.info('Session resumed (sid saved %.0fs ago).' % (time.time() - snapshot['saved_at']))
+
+    def snapshot(self, email, platform):
+        """Return resumable state of logged in session.
+
+        :params email: Email.
+        :params platform: Platform.
+        """
+        data = dict((key, getattr(self, key)) for key in snapshot_keys)
+        data.update(email=email.lower(), platform=platform, headers=dict(self.r.headers))
+        return data
 
     def __login__(self, email, passwd, code=None, totp=None, sms=False):
         """Log in - needed only if we don't have access token or it's expired."""
         params = {'prompt': 'login',
                   'accessToken': 'null',
-                  'client_id': client_id,
+                  'client_id': urls.clientId(),
                   'response_type': 'token',
                   'display': 'web2/login',
                   'locale': 'en_US',
@@ -419,6 +458,7 @@ class Core(object):
         # TODO: check first if login is needed (https://www.easports.com/fifa/api/isUserLoggedIn)
         # TODO: get gamesku, url from shards !!
 
+        urls.checkRemoteConfig()  # futweb maintenance etc.
         self.emulate = emulate
         secret_answer_hash = EAHashingAlgorithm().EAHash(secret_answer)
         # create session
@@ -525,7 +565,7 @@ class Core(object):
 
         # shards
         self._ = int(time.time() * 1000)
-        rc = self.r.get('https://%s/ut/shards/v2' % auth_url, data={'_': self._}).json()  # TODO: parse this
+        rc = self.r.get('https://%s/ut/shards/v2' % urls.authUrl(), data={'_': self._}).json()  # TODO: parse this
         self._ += 1
         self.fut_host = {
             'pc': 'utas.external.s2.fut.ea.com:443',
@@ -616,7 +656,7 @@ class Core(object):
                         self.logger.debug('Attempt #{}'.format(attempt))
                         task = FunCaptchaTask(
                             'https://www.easports.com',
-                            fun_captcha_public_key,
+                            urls.funCaptchaPublicKey(),
                             proxy=Proxy.parse_url(proxies.get('http') or proxies.get('https')),
                             user_agent=self.r.headers['User-Agent']
                         )
@@ -655,7 +695,7 @@ class Core(object):
         self.r.headers['X-UT-PHISHING-TOKEN'] = self.token = rc['token']
 
         # init pin
-        self.pin = Pin(sid=self.sid, nucleus_id=self.nucleus_id, persona_id=self.persona_id, dob=self.dob[:-3], platform=platform)
+        self.pin = Pin(sid=self.sid, nucleus_id=self.nucleus_id, persona_id=self.persona_id, dob=self.dob[:-3], platform=platform, limiter=self.limiter)
         events = [self.pin.event('login', status='success')]
         self.pin.send(events)
 
@@ -683,6 +723,8 @@ class Core(object):
         # expired_in
 
         self.saveSession()
+        if self.session_store:
+            self.session_store.saveSnapshot(self.snapshot(email, platform))
 
         # pinEvents - home screen
         events = [self.pin.event('page_view', 'Hub - Home')]
@@ -702,27 +744,29 @@ class Core(object):
 #        return self.r.get(self.urls['shards'], params={'_': int(time.time()*1000)}, timeout=self.timeout).json()
 #        # self.r.headers['X-UT-Route'] = self.urls['fut_pc']
 
-    def __request__(self, method, url, data=None, params=None, fast=False):
+    def __request__(self, method, url, data=None, params=None, fast=False, priority=None):
         """Prepare headers and sends request. Returns response as a json object.
 
         :params method: Rest method.
         :params url: Url.
+        :params priority: (optional) Priority class (fut.ratelimit.PRIORITY_*), guessed from url by default.
         """
         # TODO: update credtis?
         data = data or {}
         params = params or {}
+        if priority is None:
+            priority = requestPriority(method, url)
+        endpoint = endpointFamily(url)
         url = 'https://%s/ut/game/fifa18/%s' % (self.fut_host, url)
 
         self.logger.debug("request: {0} data={1};  params={2}".format(url, data, params))
         if method.upper() == 'GET':
             params['_'] = self._  # only for get(?)
             self._ += 1
-        if not fast:  # TODO: refactorization
-            time.sleep(max(self.request_time - time.time() + random.randrange(self.delay[0], self.delay[1] + 1), 0))  # respect minimum delay
+        self.limiter.acquire(fast=fast, priority=priority)  # respect minimum delay and requests budget
+        if not fast:
             self.r.options(url, params=params)
-        else:
-            time.sleep(max(self.request_time - time.time() + 1.4, 0))  # respect 1s minimum delay between requests
-        self.request_time = time.time()  # save request time for delay calculations
+        sent = time.monotonic()
         if method.upper() == 'GET':
             rc = self.r.get(url, data=data, params=params, timeout=self.timeout)
         elif method.upper() == 'POST':
@@ -731,6 +775,10 @@ class Core(object):
             rc = self.r.put(url, data=data, params=params, timeout=self.timeout)
         elif method.upper() == 'DELETE':
             rc = self.r.delete(url, data=data, params=params, timeout=self.timeout)
+        self.last_request_time = (sent, time.monotonic())
+        self.latency.record(endpoint, self.last_request_time[1] - sent)
+        metrics.requests_sent.inc(endpoint=endpoint, status=rc.status_code)
+        metrics.request_seconds.observe(self.last_request_time[1] - sent, endpoint=endpoint)
         self.logger.debug("response: {0}".format(rc.content))
         if not rc.ok:  # status != 200
             # TODO: catch all error codes https://gist.github.com/oczkers/cebecbf4c6a4362a843424edb443ba59
@@ -780,7 +828,7 @@ class Core(object):
                 self.credits = rc['credits']
             if 'duplicateItemIdList' in rc:
                 self.duplicates = [i['itemId'] for i in rc['duplicateItemIdList']]
-        self.saveSession()
+        self.saveSession(flush=False)  # written in background
         return rc
 
     def __sendToPile__(self, pile, trade_id=None, item_id=None):
@@ -789,9 +837,6 @@ class Core(object):
         :params trade_id: (optional?) Trade id.
         :params item_id: Iteam id.
         """
-        method = 'PUT'
-        url = 'item'
-
         # if pile == 'watchlist':
         #     params = {'tradeId': trade_id}
         #     data = {'auctionInfo': [{'id': trade_id}]}
@@ -804,17 +849,37 @@ class Core(object):
         # else:
         #     # unassigned item
         #     data = {"itemData": [{"pile": pile, "id": str(item_id)}]}
+        if not isinstance(item_id, (list, tuple)):
+            item_id = (item_id,)
+        rc = self.moveItems(pile, item_id)
+        return rc[int(item_id[0])]['success']
+
+    def moveItems(self, pile, item_id):
+        """Move items to pile with one request. Returns result of every item {item_id: {'success': bool, 'reason': str}}.
+
+        :params pile: [trade/club/...] Pile.
+        :params item_id: Item id or list of them.
+        """
+        method = 'PUT'
+        url = 'item'
+
         if not isinstance(item_id, (list, tuple)):
             item_id = (item_id,)
         data = {"itemData": [{'pile': pile, 'id': str(i)} for i in item_id]}
 
         rc = self.__request__(method, url, data=json.dumps(data))
-        if rc['itemData'][0]['success']:
-            self.logger.info("{0} (itemId: {1}) moved to {2} Pile".format(trade_id, item_id, pile))
-        else:
-            self.logger.error("{0} (itemId: {1}) NOT MOVED to {2} Pile. REASON: {3}".format(trade_id, item_id, pile, rc['itemData'][0]['reason']))
-            # if rc['itemData'][0]['reason'] == 'Duplicate Item Type' and rc['itemData'][0]['errorCode'] == 472:  # errorCode check is enought?
-        return rc['itemData'][0]['success']
+        rc = dict((int(i['id']), i) for i in rc['itemData'])
+        self.piles.move([i for i in rc if rc[i]['success']], pile)
+        for i in item_id:
+            i = int(i)
+            if i not in rc:  # not mentioned in response
+                rc[i] = {'id': i, 'success': False, 'reason': 'No result'}
+            if rc[i]['success']:
+                self.logger.info("(itemId: {0}) moved to {1} Pile".format(i, pile))
+            else:
+                self.logger.error("(itemId: {0}) NOT MOVED to {1} Pile. REASON: {2}".format(i, pile, rc[i].get('reason')))
+                # if rc[i]['reason'] == 'Duplicate Item Type' and rc[i]['errorCode'] == 472:  # errorCode check is enought?
+        return rc
 
     def logout(self, save=True):
         """Log out nicely (like clicking on logout button).
@@ -825,18 +890,32 @@ class Core(object):
         # self.r.get('https://accounts.ea.com/connect/clearsid', params={'ct': self._})
         # self.r.get('https://beta.www.origin.com/views/logout.html', params={'ct': self._})
         # self.r.get('https://help.ea.com/community/logout/', params={'ct': self._})
+        self.pin.close()  # flush queued pinEvents
         self.r.delete('https://%s/ut/auth' % self.fut_host, timeout=self.timeout)
         if save:
             self.saveSession()
+        if self.session_store:
+            self.session_store.dropSnapshot()  # sid is not valid anymore
+            self.session_store.close(save=save)
+        metrics.budget_used.remove(account=self.account)
+        metrics.budget_remaining.remove(account=self.account)
         # needed? https://accounts.ea.com/connect/logout?client_id=FIFA-18-WEBCLIENT&redirect_uri=https://www.easports.com/fifa/ultimate-team/web-app/auth.html
         return True
 
+    @property
+    def credits(self):
+        """Return last known credit amount (see balance)."""
+        balance = self.credit_tracker.balance
+        return 0 if balance is None else balance
+
+    @credits.setter
+    def credits(self, value):
+        self.credit_tracker.sync(value)
+
     @property
     def players(self):
         """Return all players in dict {id: c, f, l, n, r}."""
-        if not self._players:
-            self._players = players()
-        return self._players
+        return players(timeout=self.timeout)
 
     @property
     def playstyles(self, year=2018):
@@ -844,9 +923,7 @@ class Core(object):
 
         :params year: Year.
         """
-        if not self._playstyles:
-            self._playstyles = playstyles()
-        return self._playstyles
+        return playstyles(year, timeout=self.timeout)
 
     @property
     def nations(self):
@@ -854,9 +931,7 @@ class Core(object):
 
         :params year: Year.
         """
-        if not self._nations:
-            self._nations = nations()
-        return self._nations
+        return nations(timeout=self.timeout)
 
     @property
     def leagues(self, year=2018):
@@ -864,9 +939,7 @@ class Core(object):
 
         :params year: Year.
         """
-        if year not in self._leagues:
-            self._leagues[year] = leagues(year)
-        return self._leagues[year]
+        return leagues(year, timeout=self.timeout)
 
     @property
     def teams(self, year=2018):
@@ -874,9 +947,7 @@ class Core(object):
 
         :params year: Year.
         """
-        if year not in self._teams:
-            self._teams[year] = teams(year)
-        return self._teams[year]
+        return teams(year, timeout=self.timeout)
 
     @property
     def stadiums(self):
@@ -884,16 +955,17 @@ class Core(object):
 
         :params year: Year.
         """
-        if not self._stadiums:
-            self._stadiums = stadiums()
-        return self._stadiums
+        return stadiums(timeout=self.timeout)
 
-    def saveSession(self):
-        """Save cookies/session."""
-        if self.cookies_file:
-            self.r.cookies.save(ignore_discard=True)
-            with open(self.token_file, 'w') as f:
-                f.write('%s %s' % (self.token_type, self.access_token))
+    def saveSession(self, flush=True):
+        """Save cookies/session.
+
+        :params flush: (optional) False to only mark session as changed, it's written by background thread then.
+        """
+        if self.session_store:
+            self.session_store.update(self.r.cookies, self.token_type, self.access_token)
+            if flush:
+                self.session_store.flush()
 
     def baseId(self, *args, **kwargs):
         """Calculate base id and version from a resource id."""
@@ -1028,7 +1100,13 @@ class Core(object):
             events = [self.pin.event('page_view', 'Transfer Market Results - List View')]
             self.pin.send(events, fast=fast)
 
-        return [itemParse(i) for i in rc.get('auctionInfo', ())]
+        if self.time_to_first_search is None:
+            self.time_to_first_search = time.monotonic() - self.started
+            self.logger.info('Time to first search: %.2fs (%s).' % (self.time_to_first_search, 'resumed session' if self.resumed else 'full login'))
+
+        items = [itemParse(i) for i in rc.get('auctionInfo', ())]
+        self.statuses.update(items)
+        return items
 
     def searchAuctions(self, *args, **kwargs):
         """Alias for search method, just to keep compatibility."""
@@ -1057,18 +1135,33 @@ class Core(object):
         url = 'trade/%s/bid' % trade_id
 
         if not fast:
-            rc = self.tradeStatus(trade_id)[0]
-            # don't bid if current bid is equal or greater than our max bid
-            if rc['currentBid'] >= bid or self.credits < bid:
+            rc = self.statuses.get(trade_id)  # cached or batched with other callers
+            # don't bid if trade has expired or current bid is equal or greater than our max bid
+            if not rc or rc[0]['currentBid'] >= bid or self.credits < bid:
                 return False  # TODO: add exceptions
         data = {'bid': bid}
         try:
-            rc = self.__request__(method, url, data=json.dumps(data), params={'sku_b': self.sku_b}, fast=fast)['auctionInfo'][0]
+            rc = self.__request__(method, url, data=json.dumps(data), params={'sku_b': self.sku_b}, fast=fast)
         except PermissionDenied:  # too slow, somebody took it already :-(
+            metrics.bids.inc(kind='bid', result='rejected')
             return False
+        synced = bool(rc.get('credits'))  # balance already updated by __request__
+        rc = itemParse(rc['auctionInfo'][0], full=False)
+        self.statuses.update([rc])
+        self.auctions.ingest([rc], *self.last_request_time)
         if rc['bidState'] == 'highest' or (rc['tradeState'] == 'closed' and rc['bidState'] == 'buyNow'):  # checking 'tradeState' is required?
+            if rc['tradeState'] == 'closed':  # bought, item waits in unassigned pile
+                self.piles.add('unassigned', item_id=rc['id'])
+                metrics.bids.inc(kind='buy_now', result='success')
+                metrics.coins_spent.inc(bid)
+            else:
+                self.piles.add('watchlist', item_id=rc['id'], trade_id=rc['tradeId'])
+                metrics.bids.inc(kind='bid', result='success')
+            if not synced:
+                self.credit_tracker.spend(bid)  # credits are held until we're outbid
             return True
         else:
+            metrics.bids.inc(kind='bid', result='failed')
             return False
 
     def club(self, sort='desc', ctype='player', defId='', start=0, count=91,
@@ -1187,10 +1280,11 @@ class Core(object):
         return self.squad(squad_id='list')
     '''
 
-    def tradeStatus(self, trade_id):
+    def tradeStatus(self, trade_id, fast=False):
         """Return trade status.
 
         :params trade_id: Trade id.
+        :params fast: True for fastest request (skips OPTIONS request).
         """
         method = 'GET'
         url = 'trade/status'
@@ -1199,8 +1293,10 @@ class Core(object):
             trade_id = (trade_id,)
         trade_id = (str(i) for i in trade_id)
         params = {'tradeIds': ','.join(trade_id)}  # multiple trade_ids not tested
-        rc = self.__request__(method, url, params=params)
-        return [itemParse(i, full=False) for i in rc['auctionInfo']]
+        rc = self.__request__(method, url, params=params, fast=fast)
+        items = [itemParse(i, full=False) for i in rc['auctionInfo']]
+        self.auctions.ingest(items, *self.last_request_time)
+        return items
 
     def tradepile(self):
         """Return items in tradepile."""
@@ -1208,12 +1304,16 @@ class Core(object):
         url = 'tradepile'
 
         rc = self.__request__(method, url)
+        if not rc.get('credits'):  # sold items are paid without telling us
+            self.credit_tracker.soldItems(i['tradeId'] for i in rc.get('auctionInfo', ()) if i.get('tradeState') == 'closed')
 
         # pinEvents
         events = [self.pin.event('page_view', 'Transfer List - List View')]
         self.pin.send(events)
 
-        return [itemParse(i) for i in rc.get('auctionInfo', ())]
+        items = [itemParse(i) for i in rc.get('auctionInfo', ())]
+        self.piles.sync('tradepile', items)
+        return items
 
     def watchlist(self):
         """Return items in watchlist."""
@@ -1226,7 +1326,11 @@ class Core(object):
         events = [self.pin.event('page_view', 'Transfer Targets - List View')]
         self.pin.send(events)
 
-        return [itemParse(i) for i in rc.get('auctionInfo', ())]
+        items = [itemParse(i) for i in rc.get('auctionInfo', ())]
+        self.statuses.update(items)
+        self.piles.sync('watchlist', items)
+        self.auctions.ingest(items, *self.last_request_time)
+        return items
 
     def unassigned(self):
         """Return Unassigned items (i.e. buyNow items)."""
@@ -1239,7 +1343,9 @@ class Core(object):
         events = [self.pin.event('page_view', 'Unassigned Items - List View')]
         self.pin.send(events)
 
-        return [itemParse({'itemData': i}) for i in rc.get('itemData', ())]
+        items = [itemParse({'itemData': i}) for i in rc.get('itemData', ())]
+        self.piles.sync('unassigned', items)
+        return items
 
     def sell(self, item_id, bid, buy_now, duration=3600, fast=False):
         """Start auction. Returns trade_id.
@@ -1255,6 +1361,7 @@ class Core(object):
         # TODO: auto send to tradepile
         data = {'buyNowPrice': buy_now, 'startingBid': bid, 'duration': duration, 'itemData': {'id': item_id}}
         rc = self.__request__(method, url, data=json.dumps(data), params={'sku_b': self.sku_b})
+        self.piles.add('tradepile', item_id=int(item_id), trade_id=rc['id'])
         if not fast:  # tradeStatus check like webapp do
             self.tradeStatus(rc['id'])
         return rc['id']
@@ -1269,9 +1376,13 @@ class Core(object):
 
         if not isinstance(item_id, (list, tuple)):
             item_id = (item_id,)
-        item_id = (str(i) for i in item_id)
-        params = {'itemIds': ','.join(item_id)}
-        self.__request__(method, url, params=params)  # {"items":[{"id":280607437106}],"totalCredits":18136}
+        params = {'itemIds': ','.join(str(i) for i in item_id)}
+        rc = self.__request__(method, url, params=params)  # {"items":[{"id":280607437106}],"totalCredits":18136}
+        self.piles.remove(item_ids=[int(i) for i in item_id])
+        if rc.get('totalCredits'):
+            self.credits = rc['totalCredits']
+        else:
+            self.credit_tracker.invalidate()
         return True
 
     def watchlistDelete(self, trade_id):
@@ -1284,9 +1395,11 @@ class Core(object):
 
         if not isinstance(trade_id, (list, tuple)):
             trade_id = (trade_id,)
-        trade_id = (str(i) for i in trade_id)
-        params = {'tradeId': ','.join(trade_id)}
+        params = {'tradeId': ','.join(str(i) for i in trade_id)}
         self.__request__(method, url, params=params)  # returns nothing
+        self.piles.remove(trade_ids=[int(i) for i in trade_id])
+        for i in trade_id:
+            self.auctions.untrack(int(i))  # no more deadline events
         return True
 
     def tradepileDelete(self, trade_id):  # item_id instead of trade_id?
@@ -1299,6 +1412,7 @@ class Core(object):
 
         self.__request__(method, url)  # returns nothing
         # TODO: validate status code
+        self.piles.remove(trade_ids=(int(trade_id),))
         return True
 
     def tradepileClear(self):
@@ -1307,6 +1421,7 @@ class Core(object):
         url = 'trade/sold'
 
         self.__request__(method, url)
+        self.piles.invalidate('tradepile')  # we don't know which items were sold
         # return True
 
     def sendToTradepile(self, item_id, safe=True):
@@ -1315,8 +1430,11 @@ class Core(object):
         :params item_id: Item id.
         :params safe: (optional) False to disable tradepile free space check.
         """
-        if safe and len(self.tradepile()) >= self.tradepile_size:  # TODO?: optimization (don't parse items in tradepile)
-            return False
+        if safe:
+            if self.piles.stale('tradepile'):
+                self.tradepile()  # resync, rare
+            if self.piles.free('tradepile') < (len(item_id) if isinstance(item_id, (list, tuple)) else 1):
+                return False
         return self.__sendToPile__('trade', item_id=item_id)
 
     def sendToClub(self, item_id):
@@ -1335,7 +1453,9 @@ class Core(object):
         url = 'watchlist'
 
         data = {'auctionInfo': [{'id': trade_id}]}
-        return self.__request__(method, url, data=json.dumps(data))
+        rc = self.__request__(method, url, data=json.dumps(data))
+        self.piles.add('watchlist', trade_id=int(trade_id))
+        return rc
 
     def sendToSbs(self, challenge_id, item_id):
         """Send card FROM CLUB to first free slot in sbs squad."""
@@ -1410,6 +1530,12 @@ class Core(object):
 
         return self.__request__(method, url)['credits']
 
+    def balance(self):
+        """Return credit amount. It's known from responses, keepalive is sent only when balance is stale or inconsistent."""
+        if self.credit_tracker.stale():
+            return self.keepalive()
+        return self.credits
+
     def pileSize(self):
         """Return size of tradepile and watchlist."""
         rc = self._usermassinfo['pileSizeClientData']['entries']
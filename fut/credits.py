@@ -0,0 +1,76 @@
+# -*- coding: utf-8 -*-
+
+"""
+fut.credits
+~~~~~~~~~~~~~~~~~~~~~
+
+This module implements the fut's credit (coins) tracker.
+
+"""
+
+import time
+import threading
+
+from .config import credits_ttl
+from .log import logger
+
+
+class CreditTracker(object):
+    """Credit balance derived from responses (most of them carry `credits`) and from known spend.
+
+    Local balance can only be lower than the real one (refunds after outbid
+    and sold items are learned from next response or resync), so coin limit
+    checks based on it stay on the safe side. Resync (keepalive) is needed
+    only when balance is unknown, older than ttl or inconsistent.
+    """
+    def __init__(self, ttl=credits_ttl):
+        self.ttl = ttl
+        self.balance = None
+        self.synced_at = None  # monotonic time of last balance reported by server
+        self.consistent = True
+        self.sold = set()  # trade ids of sold items already seen in tradepile
+        self._lock = threading.Lock()
+        self.logger = logger(__name__)
+
+    def sync(self, credits):
+        """Set balance reported by server.
+
+        :params credits: Credit amount.
+        """
+        with self._lock:
+            if self.balance is not None and credits != self.balance:
+                self.logger.debug('credits: expected %s, server says %s' % (self.balance, credits))
+            self.balance = credits
+            self.synced_at = time.monotonic()
+            self.consistent = True
+
+    def spend(self, amount):
+        """Subtract known spend (bid/buy now accepted by server without credits in response).
+
+        :params amount: Credit amount.
+        """
+        with self._lock:
+            if self.balance is None:
+                return
+            self.balance -= amount
+            if self.balance < 0:  # we've missed something
+                self.consistent = False
+
+    def soldItems(self, trade_ids):
+        """Invalidate balance if tradepile shows newly sold items (their price is already on the account).
+
+        :params trade_ids: Trade ids of sold (closed) auctions in tradepile.
+        """
+        new = set(trade_ids) - self.sold
+        self.sold.update(new)
+        if new:
+            self.invalidate()
+
+    def invalidate(self):
+        """Mark balance as inconsistent - it's changed in a way we can't derive (e.g. sold items)."""
+        self.consistent = False
+
+    def stale(self):
+        """Return True if balance has to be refreshed from server."""
+        return (self.balance is None or not self.consistent or
+                time.monotonic() - self.synced_at > self.ttl)
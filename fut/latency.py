@@ -0,0 +1,107 @@
+# -*- coding: utf-8 -*-
+
+"""
+fut.latency
+~~~~~~~~~~~~~~~~~~~~~
+
+This module implements the fut's per-endpoint latency estimator.
+
+"""
+
+import threading
+from collections import deque
+
+from .config import latency_window, latency_alpha
+
+
+def endpointFamily(url):
+    """Return endpoint family of request - trade/bid, trade/status, transfermarket, watchlist, item etc.
+
+    :params url: Url (relative to /ut/game/fifa18/).
+    """
+    parts = url.split('?')[0].strip('/').split('/')
+    if parts[0] == 'trade' and len(parts) > 1:
+        return 'trade/%s' % parts[-1]  # trade/<id>/bid, trade/status
+    return parts[0]
+
+
+class Estimate(object):
+    """Round trip times of one endpoint family - ewma, mean deviation and recent samples for percentiles."""
+    def __init__(self, window=latency_window, alpha=latency_alpha):
+        self.alpha = alpha
+        self.samples = deque(maxlen=window)
+        self.count = 0
+        self.ewma = None
+        self.dev = 0.0
+
+    def add(self, seconds):
+        self.count += 1
+        self.samples.append(seconds)
+        if self.ewma is None:
+            self.ewma = seconds
+            self.dev = seconds / 2
+        else:
+            self.dev += self.alpha * 2 * (abs(seconds - self.ewma) - self.dev)  # deviation reacts faster (like tcp)
+            self.ewma += self.alpha * (seconds - self.ewma)
+
+    def percentile(self, p):
+        """Return p-th percentile (0-100) of recent samples."""
+        samples = sorted(self.samples)
+        return samples[min(int(len(samples) * p / 100.0), len(samples) - 1)]
+
+    def upper(self):
+        """Return pessimistic round trip (ewma + 4 deviations), what deadline math should count with."""
+        return self.ewma + 4 * self.dev
+
+
+class LatencyEstimator(object):
+    """Rolling round trip estimates per endpoint family, fed by Core.__request__."""
+    def __init__(self, window=latency_window, alpha=latency_alpha):
+        self.window = window
+        self.alpha = alpha
+        self.families = {}  # family: Estimate
+        self._lock = threading.Lock()
+
+    def __contains__(self, family):
+        return family in self.families
+
+    def record(self, url, seconds):
+        """Add sample.
+
+        :params url: Url (relative to /ut/game/fifa18/) or endpoint family.
+        :params seconds: Round trip time.
+        """
+        family = endpointFamily(url)
+        with self._lock:
+            estimate = self.families.get(family)
+            if estimate is None:
+                estimate = self.families[family] = Estimate(self.window, self.alpha)
+            estimate.add(seconds)
+
+    def ewma(self, family, default=None):
+        """Return smoothed round trip of endpoint family (or default when there are no samples yet)."""
+        estimate = self.families.get(family)
+        return default if estimate is None else estimate.ewma
+
+    def percentile(self, family, p, default=None):
+        """Return p-th percentile (0-100) of recent round trips of endpoint family."""
+        with self._lock:
+            estimate = self.families.get(family)
+            return default if estimate is None else estimate.percentile(p)
+
+    def upper(self, family, default=None):
+        """Return pessimistic round trip of endpoint family (ewma + 4 deviations)."""
+        estimate = self.families.get(family)
+        return default if estimate is None else estimate.upper()
+
+    def export(self):
+        """Return all estimates as dict {family: {'count', 'ewma', 'dev', 'p50', 'p90', 'p99', 'max'}} (seconds)."""
+        with self._lock:
+            return dict((family, {'count': e.count,
+                                  'ewma': e.ewma,
+                                  'dev': e.dev,
+                                  'p50': e.percentile(50),
+                                  'p90': e.percentile(90),
+                                  'p99': e.percentile(99),
+                                  'max': max(e.samples)})
+                        for family, e in self.families.items())
@@ -0,0 +1,114 @@
+# -*- coding: utf-8 -*-
+
+"""
+fut.localization
+~~~~~~~~~~~~~~~~~~~~~
+
+This module implements the fut's localization (en_US.json messages) index.
+
+"""
+
+import re
+import time
+import threading
+
+import requests
+
+from . import cache
+from .config import timeout, messages_ttl
+from .log import logger
+from .urls import messages_url
+
+# category: message key pattern, groups are (year, id) or just (id,) for categories without year
+patterns = {
+    'nations': re.compile(r'search\.nationName\.nation([0-9]+)$'),
+    'leagues': re.compile(r'global\.leagueFull\.([0-9]+)\.league([0-9]+)$'),
+    'teams': re.compile(r'global\.teamFull\.([0-9]+)\.team([0-9]+)$'),
+    'stadiums': re.compile(r'global\.stadiumFull\.([0-9]+)\.stadium([0-9]+)$'),
+    'balls': re.compile(r'BallName_([0-9]+)$'),
+    'playstyles': re.compile(r'playstyles\.([0-9]+)\.playstyle([0-9]+)$'),
+}
+cache_version = 1
+
+
+def parse(messages):
+    """Return index {category: {year: {id: name}}} of messages, year is None for nations and balls.
+
+    :params messages: Parsed en_US.json.
+    """
+    index = dict((category, {}) for category in patterns)
+    for key, value in messages.items():
+        for category, pattern in patterns.items():
+            m = pattern.match(key)
+            if m:
+                groups = m.groups()
+                year = int(groups[0]) if len(groups) == 2 else None
+                index[category].setdefault(year, {})[int(groups[-1])] = value
+                break
+    return index
+
+
+class Localization(object):
+    """Messages index built from one download, persisted on disk and shared by all sessions."""
+    def __init__(self, url=messages_url, ttl=messages_ttl, timeout=timeout):
+        self.url = url
+        self.ttl = ttl
+        self.timeout = timeout
+        self.loaded_at = None
+        self._index = None
+        self._lock = threading.Lock()
+        self.logger = logger(__name__)
+
+    def __dump(self):
+        # json keys have to be strings, None year is stored as ''
+        return {'version': cache_version,
+                'index': dict((category, dict(('' if year is None else str(year), sorted(names.items()))
+                                              for year, names in years.items()))
+                              for category, years in self._index.items())}
+
+    def __undump(self, data):
+        if data.get('version') != cache_version:
+            return None
+        return dict((category, dict((int(year) if year else None, dict((int(i), name) for i, name in names))
+                                    for year, names in years.items()))
+                    for category, years in data['index'].items())
+
+    def refresh(self, timeout=None):
+        """Download messages, rebuild index and save it in cache."""
+        rc = requests.get(self.url, timeout=timeout or self.timeout)
+        rc.encoding = 'utf-8'  # guessing takes huge amount of cpu time
+        self._index = parse(rc.json())
+        self.loaded_at = time.time()
+        cache.save('localization.json', self.__dump())
+
+    def __ensure(self, timeout=None):
+        with self._lock:
+            if self._index is None:
+                data, age = cache.load('localization.json')
+                index = data and self.__undump(data)
+                if index:
+                    self._index = index
+                    self.loaded_at = time.time() - age
+            if self._index is None:
+                self.refresh(timeout=timeout)
+            elif time.time() - self.loaded_at > self.ttl:
+                try:
+                    self.refresh(timeout=timeout)
+                except (requests.RequestException, ValueError):
+                    self.logger.exception('Unable to refresh messages, using cached ones.')
+                    self.loaded_at = time.time()  # try again after next ttl
+
+    def get(self, category, year=None, timeout=None):
+        """Return all names of category in dict {id0: name0, id1: name1}.
+
+        :params category: [nations/leagues/teams/stadiums/balls/playstyles] Category.
+        :params year: (optional) Year, ignored for nations and balls.
+        """
+        self.__ensure(timeout=timeout)
+        if category in ('nations', 'balls'):
+            year = None
+        return dict(self._index[category].get(year, {}))
+
+
+# shared by all Core instances in current process
+localization = Localization()
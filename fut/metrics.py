@@ -0,0 +1,258 @@
+# -*- coding: utf-8 -*-
+
+"""
+fut.metrics
+~~~~~~~~~~~~~~~~~~~~~
+
+This module implements the fut's metrics (counters, gauges, histograms) with prometheus text exposition.
+
+"""
+
+import bisect
+import threading
+import contextlib
+
+from http.server import BaseHTTPRequestHandler, HTTPServer
+
+from . import cache
+
+_local = threading.local()
+
+
+def escape(value):
+    return str(value).replace('\\', r'\\').replace('"', r'\"').replace('\n', r'\n')
+
+
+def formatLabels(names, values, extra=()):
+    pairs = list(zip(names, values)) + list(extra)
+    if not pairs:
+        return ''
+    return '{%s}' % ','.join('%s="%s"' % (k, escape(v)) for k, v in pairs)
+
+
+def formatValue(value):
+    if value == float('inf'):
+        return '+Inf'
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class Metric(object):
+    """Named metric, values are kept per label values."""
+    type = None
+
+    def __init__(self, name, help, labels=()):
+        self.name = name
+        self.help = help
+        self.labels = tuple(labels)
+        self.values = {}  # label values: value
+        self._lock = threading.Lock()
+
+    def key(self, labels):
+        if set(labels) != set(self.labels):
+            raise ValueError('%s expects labels %s, got %s' % (self.name, self.labels, tuple(labels)))
+        return tuple(labels[i] for i in self.labels)
+
+    def get(self, **labels):
+        """Return current value (0 if it was never set)."""
+        return self.values.get(self.key(labels), 0)
+
+    def samples(self):
+        """Return [(suffix, label values, extra labels, value)]."""
+        with self._lock:
+            return [('', k, (), v) for k, v in sorted(self.values.items())]
+
+    def exposition(self):
+        lines = ['# HELP %s %s' % (self.name, self.help), '# TYPE %s %s' % (self.name, self.type)]
+        for suffix, values, extra, value in self.samples():
+            lines.append('%s%s%s %s' % (self.name, suffix, formatLabels(self.labels, values, extra), formatValue(value)))
+        return '\n'.join(lines)
+
+
+class Counter(Metric):
+    """Monotonically increasing value (requests, coins spent...)."""
+    type = 'counter'
+
+    def inc(self, amount=1, **labels):
+        key = self.key(labels)
+        with self._lock:
+            self.values[key] = self.values.get(key, 0) + amount
+
+
+class Gauge(Metric):
+    """Value which goes up and down, optionally read from function on every exposition."""
+    type = 'gauge'
+
+    def __init__(self, name, help, labels=()):
+        super(Gauge, self).__init__(name, help, labels)
+        self.functions = {}  # label values: callable
+
+    def set(self, value, **labels):
+        key = self.key(labels)
+        with self._lock:
+            self.values[key] = value
+
+    def inc(self, amount=1, **labels):
+        key = self.key(labels)
+        with self._lock:
+            self.values[key] = self.values.get(key, 0) + amount
+
+    def setFunction(self, function, **labels):
+        """Read value from function (e.g. limiter.used) when metrics are exposed."""
+        key = self.key(labels)
+        with self._lock:
+            self.functions[key] = function
+
+    def remove(self, **labels):
+        """Drop value (and function) of given labels, e.g. when account logs out."""
+        key = self.key(labels)
+        with self._lock:
+            self.values.pop(key, None)
+            self.functions.pop(key, None)
+
+    def samples(self):
+        with self._lock:
+            values = dict(self.values)
+            functions = dict(self.functions)
+        for key, function in functions.items():
+            values[key] = function()
+        return [('', k, (), v) for k, v in sorted(values.items())]
+
+
+class Histogram(Metric):
+    """Distribution of values (latency, wait times) in cumulative buckets."""
+    type = 'histogram'
+    default_buckets = (0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+
+    def __init__(self, name, help, labels=(), buckets=default_buckets):
+        super(Histogram, self).__init__(name, help, labels)
+        self.buckets = tuple(sorted(buckets))
+
+    def observe(self, value, **labels):
+        key = self.key(labels)
+        with self._lock:
+            record = self.values.get(key)
+            if record is None:
+                record = self.values[key] = [[0] * len(self.buckets), 0.0, 0]  # bucket counts, sum, count
+            i = bisect.bisect_left(self.buckets, value)
+            if i < len(self.buckets):
+                record[0][i] += 1
+            record[1] += value
+            record[2] += 1
+
+    def get(self, **labels):
+        """Return (sum, count)."""
+        record = self.values.get(self.key(labels))
+        return (record[1], record[2]) if record else (0.0, 0)
+
+    def samples(self):
+        samples = []
+        with self._lock:
+            for key, (counts, total, count) in sorted(self.values.items()):
+                cumulative = 0
+                for bound, n in zip(self.buckets, counts):
+                    cumulative += n
+                    samples.append(('_bucket', key, (('le', formatValue(float(bound))),), cumulative))
+                samples.append(('_bucket', key, (('le', '+Inf'),), count))
+                samples.append(('_sum', key, (), total))
+                samples.append(('_count', key, (), count))
+        return samples
+
+
+class Registry(object):
+    """Set of metrics exposed together (prometheus text format, file or local http endpoint)."""
+    def __init__(self):
+        self.metrics = {}  # name: Metric
+        self._lock = threading.Lock()
+        self.server = None
+
+    def __register(self, cls, name, *args, **kwargs):
+        with self._lock:
+            metric = self.metrics.get(name)
+            if metric is None:
+                metric = self.metrics[name] = cls(name, *args, **kwargs)
+            elif not isinstance(metric, cls):
+                raise ValueError('%s is already registered as %s' % (name, metric.type))
+            return metric
+
+    def counter(self, name, help, labels=()):
+        """Return counter (created on first use)."""
+        return self.__register(Counter, name, help, labels)
+
+    def gauge(self, name, help, labels=()):
+        """Return gauge (created on first use)."""
+        return self.__register(Gauge, name, help, labels)
+
+    def histogram(self, name, help, labels=(), buckets=Histogram.default_buckets):
+        """Return histogram (created on first use)."""
+        return self.__register(Histogram, name, help, labels, buckets=buckets)
+
+    def exposition(self):
+        """Return all metrics in prometheus text format."""
+        with self._lock:
+            metrics = sorted(self.metrics.values(), key=lambda m: m.name)
+        return '\n'.join(m.exposition() for m in metrics) + '\n'
+
+    def write(self, path):
+        """Write metrics to file atomically (e.g. for node_exporter's textfile collector).
+
+        :params path: File path.
+        """
+        cache.atomicWrite(path, self.exposition())
+
+    def serve(self, port=9000, host='127.0.0.1'):
+        """Expose metrics at http://host:port/metrics (daemon thread). Returns HTTPServer.
+
+        :params port: (optional) Port.
+        :params host: (optional) Interface, local only by default.
+        """
+        registry = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                body = registry.exposition().encode('utf-8')
+                self.send_response(200)
+                self.send_header('Content-Type', 'text/plain; version=0.0.4; charset=utf-8')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, *args):  # don't spam stderr with every scrape
+                pass
+
+        self.server = HTTPServer((host, port), Handler)
+        thread = threading.Thread(target=self.server.serve_forever, name='fut-metrics')
+        thread.daemon = True
+        thread.start()
+        return self.server
+
+
+@contextlib.contextmanager
+def mode(name):
+    """Label time spent waiting (rate limiter, sleeps) in this thread with loop mode (cycle, buy_now etc.).
+
+    :params name: Mode name.
+    """
+    previous = getattr(_local, 'mode', None)
+    _local.mode = name
+    try:
+        yield
+    finally:
+        _local.mode = previous
+
+
+def currentMode():
+    """Return loop mode of current thread ('other' outside of mode block)."""
+    return getattr(_local, 'mode', None) or 'other'
+
+
+registry = Registry()
+
+requests_sent = registry.counter('fut_requests_total', 'Requests sent to fut by endpoint family and status code.', ('endpoint', 'status'))
+request_seconds = registry.histogram('fut_request_seconds', 'Round trip time of fut requests.', ('endpoint',))
+bids = registry.counter('fut_bids_total', 'Bids sent (bid or buy now) by result.', ('kind', 'result'))
+auctions = registry.counter('fut_auctions_total', 'Watched auctions ended (won, lost, expired).', ('result',))
+coins_spent = registry.counter('fut_coins_spent_total', 'Coins paid for won auctions and buy now.')
+budget_used = registry.gauge('fut_budget_used', 'Requests sent in current budget window.', ('account',))
+budget_remaining = registry.gauge('fut_budget_remaining', 'Requests left in current budget window.', ('account',))
+pin_events = registry.counter('fut_pin_events_total', 'Pin (telemetry) events posted.')
+sleep_seconds = registry.counter('fut_sleep_seconds_total', 'Seconds spent waiting (rate limiter, idle) by loop mode.', ('mode',))
@@ -0,0 +1,123 @@
+# -*- coding: utf-8 -*-
+
+"""
+fut.piles
+~~~~~~~~~~~~~~~~~~~~~
+
+This module implements the fut's pile (tradepile, watchlist, unassigned) occupancy model.
+
+"""
+
+import time
+import threading
+
+from .config import piles_ttl
+
+# pile names used by fut api (item/pile) mapped to ours
+pile_names = {'trade': 'tradepile',
+              'watchlist': 'watchlist'}
+
+
+class Piles(object):
+    """Items in tradepile, watchlist and unassigned pile, updated locally from every move, sell, delete etc.
+
+    Every pile is a set of (item_id, trade_id) or None when it's unknown and
+    has to be synced (by fetching the pile), which is also done every `ttl` seconds.
+    """
+    def __init__(self, tradepile_size, watchlist_size, ttl=piles_ttl):
+        self.sizes = {'tradepile': tradepile_size,
+                      'watchlist': watchlist_size,
+                      'unassigned': None}
+        self.ttl = ttl
+        self.items = dict((pile, None) for pile in self.sizes)
+        self.synced_at = dict((pile, None) for pile in self.sizes)
+        self._lock = threading.Lock()
+
+    def seed(self, usermassinfo):
+        """Seed piles with data received at login (only unassigned items are there).
+
+        :params usermassinfo: Usermassinfo response.
+        """
+        purchased = usermassinfo.get('purchasedItems') or {}
+        if 'itemData' in purchased:
+            self.sync('unassigned', [{'id': i['id'], 'tradeId': None} for i in purchased['itemData']])
+
+    def sync(self, pile, items):
+        """Replace pile content with fetched one.
+
+        :params pile: [tradepile/watchlist/unassigned] Pile.
+        :params items: Parsed items (itemParse).
+        """
+        with self._lock:
+            self.items[pile] = set((i['id'], i['tradeId']) for i in items)
+            self.synced_at[pile] = time.monotonic()
+
+    def invalidate(self, pile):
+        """Forget pile content (it has changed in a way we can't follow, e.g. sold items cleared).
+
+        :params pile: [tradepile/watchlist/unassigned] Pile.
+        """
+        with self._lock:
+            self.items[pile] = None
+
+    def stale(self, pile):
+        """Return True if pile has to be fetched to know its content.
+
+        :params pile: [tradepile/watchlist/unassigned] Pile.
+        """
+        return self.items[pile] is None or time.monotonic() - self.synced_at[pile] > self.ttl
+
+    def count(self, pile):
+        """Return number of items in pile or None if it's unknown.
+
+        :params pile: [tradepile/watchlist/unassigned] Pile.
+        """
+        items = self.items[pile]
+        return None if items is None else len(items)
+
+    def free(self, pile):
+        """Return free space in pile or None if it's unknown.
+
+        :params pile: [tradepile/watchlist] Pile.
+        """
+        count = self.count(pile)
+        return None if count is None else self.sizes[pile] - count
+
+    def __remove(self, item_ids, trade_ids):
+        for pile, items in self.items.items():
+            if items:
+                self.items[pile] = set(i for i in items if i[0] not in item_ids and i[1] not in trade_ids)
+
+    def remove(self, item_ids=(), trade_ids=()):
+        """Remove items from all piles.
+
+        :params item_ids: (optional) Item ids.
+        :params trade_ids: (optional) Trade ids.
+        """
+        with self._lock:
+            self.__remove(set(item_ids), set(trade_ids) - set([None]))
+
+    def add(self, pile, item_id=None, trade_id=None):
+        """Put item into pile (and remove it from other piles).
+
+        :params pile: [tradepile/watchlist/unassigned] Pile.
+        :params item_id: (optional) Item id.
+        :params trade_id: (optional) Trade id.
+        """
+        with self._lock:
+            self.__remove(set([item_id]) - set([None]), set([trade_id]) - set([None]))
+            if self.items[pile] is not None:
+                self.items[pile].add((item_id, trade_id))
+
+    def move(self, item_ids, pile):
+        """Move items to pile (item/pile request).
+
+        :params item_ids: Item ids moved successfully.
+        :params pile: [trade/club/...] Target pile (fut api name).
+        """
+        pile = pile_names.get(pile)
+        for item_id in item_ids:
+            if pile:
+                self.add(pile, item_id=item_id)
+            else:  # club etc.
+                self.remove(item_ids=(item_id,))
@@ -12,32 +12,106 @@ import requests
 import re
 import json
 import time
+import threading
 from random import random
 from datetime import datetime
+try:
+    import queue
+except ImportError:  # python2
+    import Queue as queue
 
-from .config import headers
-from .urls import pin_url
+from . import cache
+from . import urls
+from . import metrics
+from .config import headers, timeout, pin_ttl
+from .log import logger
+from .ratelimit import PRIORITY_PIN
 from .exceptions import FutError
 
 
+js_urls = (('compiled_1', 'https://www.easports.com/fifa/ultimate-team/web-app/js/compiled_1.js'),
+           ('compiled_2', 'https://www.easports.com/fifa/ultimate-team/web-app/js/compiled_2.js'))
+cache_version = 1
+_constants = {}
+_lock = threading.Lock()
+
+
+def _parse(name, rc):
+    if name == 'compiled_1':
+        return {'sku': re.search('enums.SKU.FUT="(.+?)"', rc).group(1),
+                'rel': re.search('rel:"(.+?)"', rc).group(1),
+                'gid': re.search('gid:([0-9]+?)', rc).group(1),
+                'plat': re.search('plat:"(.+?)"', rc).group(1),
+                'et': re.search('et:"(.+?)"', rc).group(1),
+                'pidt': re.search('pidt:"(.+?)"', rc).group(1),
+                'v': re.search('APP_VERSION="([0-9\.]+)"', rc).group(1)}
+    else:
+        return {'taxv': re.search('PinManager.TAXONOMY_VERSION=([0-9\.]+)', rc).group(1),
+                'tidt': re.search(',PinManager.TITLE_ID_TYPE="(.+?)"', rc).group(1)}
+
+
+def _revalidate(name, url, entry):
+    """Return fresh cache entry of js file, downloads it only if it has changed."""
+    headers = {}
+    if entry and entry.get('etag'):
+        headers['If-None-Match'] = entry['etag']
+    if entry and entry.get('last_modified'):
+        headers['If-Modified-Since'] = entry['last_modified']
+    rc = requests.get(url, headers=headers, timeout=timeout)
+    if rc.status_code == 304 and entry:
+        return entry
+    return {'etag': rc.headers.get('ETag'),
+            'last_modified': rc.headers.get('Last-Modified'),
+            'values': _parse(name, rc.text)}
+
+
+def constants():
+    """Return pinEvents constants extracted from web-app js files (sku, rel, gid, plat, et, pidt, v, taxv, tidt).
+
+    Constants are cached on disk and revalidated with conditional requests after pin_ttl seconds.
+    """
+    with _lock:
+        if _constants and time.time() - _constants['loaded_at'] < pin_ttl:
+            return _constants['values']
+        data, age = cache.load('pin.json')
+        if not data or data.get('version') != cache_version:
+            data, age = {'version': cache_version, 'files': {}}, None
+        if age is None or age > pin_ttl:
+            for name, url in js_urls:
+                entry = data['files'].get(name)
+                try:
+                    data['files'][name] = _revalidate(name, url, entry)
+                except (requests.RequestException, AttributeError):
+                    # AttributeError - regex not found, js has probably changed
+                    if not entry:
+                        raise
+                    logger(__name__).exception('Unable to revalidate %s, using cached constants.' % name)
+            cache.save('pin.json', data)
+            age = 0
+        values = {}
+        for name, url in js_urls:
+            values.update(data['files'][name]['values'])
+        _constants.update(values=values, loaded_at=time.time() - age)
+        return values
+
+
 class Pin(object):
-    def __init__(self, sku=None, sid='', nucleus_id=0, persona_id='', dob=False, platform=False):
+    def __init__(self, sku=None, sid='', nucleus_id=0, persona_id='', dob=False, platform=False, batch_size=10, batch_frequency=0.5, queue_size=100, limiter=None):
         self.sid = sid
         self.nucleus_id = nucleus_id
         self.persona_id = persona_id
         self.dob = dob
         self.platform = platform
-        rc = requests.get('https://www.easports.com/fifa/ultimate-team/web-app/js/compiled_1.js').text
-        self.sku = sku or re.search('enums.SKU.FUT="(.+?)"', rc).group(1)
-        self.rel = re.search('rel:"(.+?)"', rc).group(1)
-        self.gid = re.search('gid:([0-9]+?)', rc).group(1)
-        self.plat = re.search('plat:"(.+?)"', rc).group(1)
-        self.et = re.search('et:"(.+?)"', rc).group(1)
-        self.pidt = re.search('pidt:"(.+?)"', rc).group(1)
-        self.v = re.search('APP_VERSION="([0-9\.]+)"', rc).group(1)
-        rc = requests.get('https://www.easports.com/fifa/ultimate-team/web-app/js/compiled_2.js').text
-        self.taxv = re.search('PinManager.TAXONOMY_VERSION=([0-9\.]+)', rc).group(1)
-        self.tidt = re.search(',PinManager.TITLE_ID_TYPE="(.+?)"', rc).group(1)
+        rc = constants()
+        self.sku = sku or rc['sku']
+        self.rel = rc['rel']
+        self.gid = rc['gid']
+        self.plat = rc['plat']
+        self.et = rc['et']
+        self.pidt = rc['pidt']
+        self.v = rc['v']
+        self.taxv = rc['taxv']
+        self.tidt = rc['tidt']
 
         self.r = requests.Session()
         self.r.headers = headers
@@ -53,6 +127,16 @@ class Pin(object):
         self.custom['service_plat'] = platform[:3]
         self.s = 2  # event id  |  before "was sent" without session/persona/nucleus id so we can probably omit
 
+        # dispatcher - remote config says {"b": True, "bf": 500, "bs": 10, ...} (batch, batch frequency [ms], batch size)
+        self.batch_size = batch_size
+        self.batch_frequency = batch_frequency
+        self.queue = queue.Queue(maxsize=queue_size)
+        self.limiter = limiter  # let market requests go first
+        self.logger = logger(__name__)
+        self.dispatcher = threading.Thread(target=self.__dispatch, name='pin-dispatcher')
+        self.dispatcher.daemon = True
+        self.dispatcher.start()
+
     def __ts(self):
         # TODO: add ability to random something
         ts = datetime.utcnow()
@@ -97,8 +181,67 @@ class Pin(object):
 
         return data
 
-    def send(self, events, fast=False):
-        time.sleep(0.5 + random() / 50)
+    def send(self, events, fast=False, block=True):
+        """Queue events, dispatcher thread posts them in background (in order).
+        Returns False if events were dropped (queue is full and block is False).
+
+        :params events: List of events (see event method).
+        :params fast: True to skip OPTIONS request.
+        :params block: (optional) False to drop events instead of waiting when queue is full (e.g. from event loop).
+        """
+        if block:
+            self.queue.put((events, fast))  # blocks only when queue is full
+            return True
+        try:
+            self.queue.put_nowait((events, fast))
+        except queue.Full:  # events are not critical
+            self.logger.debug('pinEvents queue is full, %s events dropped.' % len(events))
+            return False
+        return True
+
+    def flush(self):
+        """Wait until all queued events are posted."""
+        self.queue.join()
+
+    def close(self):
+        """Post queued events and stop dispatcher thread."""
+        if self.dispatcher.is_alive():
+            self.queue.put(None)
+            self.dispatcher.join()
+
+    def __dispatch(self):
+        stop = False
+        while not stop:
+            item = self.queue.get()
+            if item is None:
+                self.queue.task_done()
+                return
+            # pacing (like webapp does) without blocking caller
+            time.sleep(self.batch_frequency + random() / 50)
+            batch = [item]
+            events = list(item[0])
+            while len(events) < self.batch_size:  # coalesce events queued in the meantime
+                try:
+                    item = self.queue.get_nowait()
+                except queue.Empty:
+                    break
+                batch.append(item)
+                if item is None:
+                    stop = True
+                    break
+                events.extend(item[0])
+            try:
+                if self.limiter:
+                    self.limiter.idle(PRIORITY_PIN, timeout=10)
+                self.__post(events, fast=all(i[1] for i in batch if i))
+                metrics.pin_events.inc(len(events))
+            except Exception:  # dispatcher has to survive anything, events are not critical
+                self.logger.exception('Unable to send pinEvents.')
+            finally:
+                for i in batch:
+                    self.queue.task_done()
+
+    def __post(self, events, fast=False):
         data = {"taxv": self.taxv,  # convert to float?
                 "tidt": self.tidt,
                 "tid": self.sku,
@@ -115,8 +258,8 @@ class Pin(object):
                 "events": events}
         # print(data)  # DEBUG
         if not fast:
-            self.r.options(pin_url)
-        rc = self.r.post(pin_url, data=json.dumps(data)).json()
+            self.r.options(urls.pinUrl())
+        rc = self.r.post(urls.pinUrl(), data=json.dumps(data)).json()
         if rc['status'] != 'ok':
             raise FutError('PinEvent is NOT OK, probably they changed something.')
         return True
@@ -0,0 +1,84 @@
+# -*- coding: utf-8 -*-
+
+"""
+fut.pipeline
+~~~~~~~~~~~~~~~~~~~~~
+
+This module implements the fut's search pipeline (interleaved market searches of many assets).
+
+"""
+
+import time
+from collections import deque
+
+from .log import logger
+
+
+class SearchPipeline(object):
+    """Pages of all assets interleaved round-robin, new trades are yielded as soon as their page arrives.
+
+    Searches go through Core's rate limiter (with lower priority than bids), so
+    caller can bid on candidates between pages. Trades already seen on earlier
+    pages (pages shift as auctions end) are skipped.
+
+    Basic usage:
+
+        >>> for item in SearchPipeline(session, {20801: 15000, 158023: 40000}):
+        ...     session.bid(item['tradeId'], item['startingBid'])
+    """
+    def __init__(self, core, assets, ctype='player', page_size=16, max_expires=3600, max_pages=None, reserve=50):
+        """:params core: Core.
+        :params assets: Dict {asset_id: max_price}.
+        :params ctype: (optional) Card type.
+        :params page_size: (optional) Items per page.
+        :params max_expires: (optional) Asset is done when page reaches auctions ending later than this (seconds).
+        :params max_pages: (optional) Maximum pages per asset.
+        :params reserve: (optional) Stop when requests budget drops to this many requests (left for bidding).
+        """
+        self.core = core
+        self.ctype = ctype
+        self.page_size = page_size
+        self.max_expires = max_expires
+        self.max_pages = max_pages
+        self.reserve = reserve
+        self.queue = deque((asset_id, max_price, 0) for asset_id, max_price in assets.items())  # (asset, max price, start)
+        self.seen = set()
+        self.searches = 0
+        self.duplicates = 0
+        self.started = None
+        self.first_candidate = None  # seconds from start to first yielded trade
+        self.logger = logger(__name__)
+
+    def __iter__(self):
+        self.started = time.monotonic()
+        while self.queue:
+            if self.core.limiter.remaining() <= self.reserve:
+                self.logger.info('search pipeline stopped, requests budget is reserved for bidding.')
+                return
+            asset_id, max_price, start = self.queue.popleft()
+            items = self.core.search(ctype=self.ctype, assetId=asset_id, max_price=max_price,
+                                     start=start, page_size=self.page_size)
+            self.searches += 1
+            # next page of this asset goes to the end of the queue (round-robin)
+            last_page = (len(items) < self.page_size or (items and items[-1]['expires'] > self.max_expires) or
+                         (self.max_pages and start // self.page_size + 1 >= self.max_pages))
+            if not last_page:
+                self.queue.append((asset_id, max_price, start + self.page_size))
+            for item in items:
+                if item['tradeId'] in self.seen:
+                    self.duplicates += 1
+                    continue
+                self.seen.add(item['tradeId'])
+                if item['expires'] > self.max_expires:
+                    continue
+                if self.first_candidate is None:
+                    self.first_candidate = time.monotonic() - self.started
+                yield item
+
+    def stats(self):
+        """Return searches sent, unique trades, duplicates skipped and time to first candidate."""
+        return {'searches': self.searches,
+                'trades': len(self.seen),
+                'duplicates': self.duplicates,
+                'first_candidate': self.first_candidate,
+                'elapsed': time.monotonic() - self.started if self.started else None}
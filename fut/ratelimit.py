@@ -0,0 +1,291 @@
+# -*- coding: utf-8 -*-
+
+"""
+fut.ratelimit
+~~~~~~~~~~~~~~~~~~~~~
+
+This module implements the fut's request scheduler (rate limiter).
+
+"""
+
+import time
+import heapq
+import asyncio
+import random
+import threading
+import itertools
+import contextlib
+from collections import deque
+
+from .config import delay, fast_delay, budget_window
+from . import metrics
+
+
+# priority classes - lower value gets free slot first
+PRIORITY_BID = 0  # bid / buy now
+PRIORITY_TRADE_STATUS = 1
+PRIORITY_PILES = 2  # watchlist / tradepile reads and everything not listed here
+PRIORITY_SEARCH = 3
+PRIORITY_PIN = 4  # pinEvents / telemetry
+priorities = {PRIORITY_BID: 'bid',
+              PRIORITY_TRADE_STATUS: 'trade_status',
+              PRIORITY_PILES: 'piles',
+              PRIORITY_SEARCH: 'search',
+              PRIORITY_PIN: 'pin'}
+
+
+class Reservation(object):
+    """Budget reserved ahead of time (e.g. for a burst of bids near auction expiry).
+
+    Unused requests are returned to the budget on release() or after `until`.
+    """
+    def __init__(self, limiter, count, until):
+        self.limiter = limiter
+        self.count = count
+        self.until = until
+
+    def release(self):
+        """Return unused requests to the budget."""
+        with self.limiter._lock:
+            self.limiter._release(self)
+
+
+class RateLimiter(object):
+    """Owns both constraints of requests sent to fut servers.
+
+    * minimum gap - token bucket of size 1 refilled after random delay (or fast_delay for fast requests),
+    * hourly budget - sliding window of `budget` requests per `window` seconds.
+
+    Callers waiting at the same time get slots by priority (then first come first served).
+    All times are time.monotonic() based.
+    """
+    def __init__(self, delay=delay, fast_delay=fast_delay, budget=None, window=budget_window):
+        self.delay = delay
+        self.fast_delay = fast_delay
+        self.budget = budget
+        self.window = window
+        self.last = 0  # time of last granted request
+        self.history = deque()  # times of granted requests in current window
+        self.reservations = []
+        self.waiting = []  # heap of (priority, ticket)
+        self._tickets = itertools.count()
+        self._stats = dict((p, {'count': 0, 'wait_total': 0.0, 'wait_max': 0.0}) for p in priorities)
+        self._lock = threading.Condition()
+        self._local = threading.local()  # reservation used by current thread (see use)
+
+    # all methods below starting with underscore expect self._lock to be held
+    def _expire(self, now):
+        while self.history and self.history[0] <= now - self.window:
+            self.history.popleft()
+        for r in [r for r in self.reservations if r.until <= now]:
+            self._release(r)
+
+    def _release(self, reservation):
+        if reservation in self.reservations:
+            self.reservations.remove(reservation)
+        reservation.count = 0
+
+    def _reserved(self):
+        return sum(r.count for r in self.reservations)
+
+    def _budgetSlot(self, now, reservation=None, count=1):
+        """Return time when budget allows next `count` requests."""
+        if self.budget is None or (reservation is not None and reservation.count > 0):
+            return now
+        if count > self.budget:  # no window would ever fit them
+            raise ValueError('%s requests never fit into budget of %s requests per window.' % (count, self.budget))
+        used = len(self.history) + self._reserved() + count - 1
+        if used < self.budget:
+            return now
+        k = used - self.budget  # that many requests have to leave the window first
+        if k < len(self.history):
+            return self.history[k] + self.window
+        return min(r.until for r in self.reservations)  # blocked by reservations only
+
+    def _gap(self, fast):
+        if fast:
+            return self.fast_delay
+        return random.randrange(self.delay[0], self.delay[1] + 1)
+
+    def used(self):
+        """Return number of requests sent in current window."""
+        with self._lock:
+            self._expire(time.monotonic())
+            return len(self.history)
+
+    def remaining(self):
+        """Return number of requests left in current window (not counting reserved ones)."""
+        if self.budget is None:
+            return float('inf')
+        with self._lock:
+            self._expire(time.monotonic())
+            return max(self.budget - len(self.history) - self._reserved(), 0)
+
+    def nextSlot(self, fast=True, count=1):
+        """Return (monotonic) time when next request can be sent.
+
+        :params fast: (optional) False to include full (random) delay, it's minimum otherwise.
+        :params count: (optional) Number of requests budget has to allow.
+        """
+        with self._lock:
+            now = time.monotonic()
+            self._expire(now)
+            gap = self.fast_delay if fast else self.delay[0]
+            return max(self.last + gap, self._budgetSlot(now, count=count))
+
+    def reserve(self, count, until=None):
+        """Reserve part of budget. Returns Reservation or None if there is not enough budget left.
+
+        :params count: Number of requests.
+        :params until: (optional) Monotonic time when unused requests return to budget (default: end of window).
+        """
+        with self._lock:
+            now = time.monotonic()
+            self._expire(now)
+            if self.budget is not None and len(self.history) + self._reserved() + count > self.budget:
+                return None
+            reservation = Reservation(self, count, until or now + self.window)
+            self.reservations.append(reservation)
+            return reservation
+
+    @contextlib.contextmanager
+    def use(self, reservation):
+        """Take budget of requests sent by current thread from reservation (unless acquire gets another one).
+
+        :params reservation: Reservation.
+        """
+        previous = getattr(self._local, 'reservation', None)
+        self._local.reservation = reservation
+        try:
+            yield reservation
+        finally:
+            self._local.reservation = previous
+
+    def _record(self, priority, waited):
+        stats = self._stats[priority]
+        stats['count'] += 1
+        stats['wait_total'] += waited
+        stats['wait_max'] = max(stats['wait_max'], waited)
+        metrics.sleep_seconds.inc(waited, mode=metrics.currentMode())
+
+    def stats(self):
+        """Return queue depth and wait times per priority class."""
+        with self._lock:
+            rc = {}
+            for p, name in priorities.items():
+                stats = self._stats[p]
+                rc[name] = {'depth': sum(1 for i in self.waiting if i[0] == p),
+                            'count': stats['count'],
+                            'wait_total': stats['wait_total'],
+                            'wait_avg': stats['wait_total'] / stats['count'] if stats['count'] else 0.0,
+                            'wait_max': stats['wait_max']}
+            return rc
+
+    def idle(self, priority=PRIORITY_PIN, timeout=None):
+        """Wait until nobody with higher priority is waiting for a slot (for traffic outside of budget like pinEvents).
+
+        :params priority: (optional) Priority class of caller.
+        :params timeout: (optional) Maximum time to wait.
+        """
+        started = time.monotonic()
+        with self._lock:
+            self._lock.wait_for(lambda: not self.waiting or self.waiting[0][0] >= priority, timeout)
+            self._record(priority, time.monotonic() - started)
+
+    def acquire(self, fast=False, reservation=None, priority=PRIORITY_PILES):
+        """Wait for slot and record request. Returns time spent waiting.
+
+        :params fast: (optional) True to use minimum delay between requests.
+        :params reservation: (optional) Reservation to take budget from.
+        :params priority: (optional) Priority class (PRIORITY_*).
+        """
+        started = time.monotonic()
+        gap = self._gap(fast)
+        if reservation is None:
+            reservation = getattr(self._local, 'reservation', None)
+        with self._lock:
+            ticket = (priority, next(self._tickets))
+            heapq.heappush(self.waiting, ticket)
+            try:
+                while True:
+                    now = time.monotonic()
+                    self._expire(now)
+                    slot = max(self.last + gap, self._budgetSlot(now, reservation))
+                    if self.waiting[0] != ticket:
+                        self._lock.wait()  # woken up when head of the queue changes
+                    elif slot > now:
+                        self._lock.wait(slot - now)  # sleep with lock released, new higher priority caller might take over
+                    else:
+                        break
+            finally:
+                self.waiting.remove(ticket)
+                heapq.heapify(self.waiting)
+                self._lock.notify_all()
+            self.last = now
+            self.history.append(now)
+            if reservation is not None and reservation.count > 0:
+                reservation.count -= 1
+                if not reservation.count:
+                    self._release(reservation)
+            self._record(priority, now - started)
+        return now - started
+
+
+class AsyncRateLimiter(RateLimiter):
+    """RateLimiter for asyncio - waiting for slot doesn't block event loop.
+
+    Every account (AsyncCore) has its own limiter, so one event loop can drive many of them.
+    """
+    def __init__(self, *args, **kwargs):
+        super(AsyncRateLimiter, self).__init__(*args, **kwargs)
+        self._changed = None  # asyncio.Condition, created in running loop
+
+    async def __wait(self, timeout):
+        if self._changed is None:
+            self._changed = asyncio.Condition()
+        async with self._changed:
+            try:
+                await asyncio.wait_for(self._changed.wait(), timeout)
+            except asyncio.TimeoutError:
+                pass
+
+    async def __notify(self):
+        if self._changed is not None:
+            async with self._changed:
+                self._changed.notify_all()
+
+    async def acquire(self, fast=False, reservation=None, priority=PRIORITY_PILES):
+        """Wait for slot and record request. Returns time spent waiting.
+
+        :params fast: (optional) True to use minimum delay between requests.
+        :params reservation: (optional) Reservation to take budget from.
+        :params priority: (optional) Priority class (PRIORITY_*).
+        """
+        started = time.monotonic()
+        gap = self._gap(fast)
+        ticket = (priority, next(self._tickets))
+        with self._lock:  # never held across await
+            heapq.heappush(self.waiting, ticket)
+        try:
+            while True:
+                with self._lock:
+                    now = time.monotonic()
+                    self._expire(now)
+                    slot = max(self.last + gap, self._budgetSlot(now, reservation))
+                    head = self.waiting[0] == ticket
+                    if head and slot <= now:
+                        self.last = now
+                        self.history.append(now)
+                        if reservation is not None and reservation.count > 0:
+                            reservation.count -= 1
+                            if not reservation.count:
+                                self._release(reservation)
+                        self._record(priority, now - started)
+                        break
+                await self.__wait(slot - now if head else None)
+        finally:
+            with self._lock:
+                self.waiting.remove(ticket)
+                heapq.heapify(self.waiting)
+            await self.__notify()
+        return now - started
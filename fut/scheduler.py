@@ -0,0 +1,170 @@
+# -*- coding: utf-8 -*-
+
+"""
+fut.scheduler
+~~~~~~~~~~~~~~~~~~~~~
+
+This module implements the fut's deadline-driven event scheduler.
+
+"""
+
+import time
+import heapq
+import itertools
+
+from .log import logger
+from . import metrics
+
+
+class Event(object):
+    """Callback scheduled at absolute (monotonic) time.
+
+    :params when: Time to run callback.
+    :params callback: Callable, gets Event as the only argument.
+    :params cost: Number of requests callback is going to send (reserved from budget before it's run).
+    :params deadline: (optional) Time after which running callback makes no sense (e.g. auction end).
+    :params key: (optional) Key, scheduling another event with the same key replaces this one.
+    """
+    def __init__(self, when, callback, cost=1, deadline=None, key=None):
+        self.when = when
+        self.callback = callback
+        self.cost = cost
+        self.deadline = deadline
+        self.key = key
+        self.cancelled = False
+        self.reservation = None
+
+    def __repr__(self):
+        return '<Event key=%r when=%.1f cost=%s deadline=%s>' % (self.key, self.when, self.cost, self.deadline)
+
+
+class Scheduler(object):
+    """Priority queue of absolute deadlines - bot sleeps until exactly the next event.
+
+    Requests budget (RateLimiter) is a hard constraint: before event is run its
+    cost is reserved, event which can't get budget is postponed until budget
+    allows it or dropped if that's after its deadline. Event whose callback
+    raises is logged and dropped, other events keep running.
+    """
+    def __init__(self, limiter=None, clock=time.monotonic, sleep=time.sleep):
+        self.limiter = limiter
+        self.clock = clock
+        self.sleep = sleep
+        self.queue = []  # heap of (when, seq, event)
+        self.keys = {}  # key: event
+        self.dropped = 0
+        self.failed = 0  # callbacks which raised
+        self._seq = itertools.count()
+        self.logger = logger(__name__)
+
+    def __len__(self):
+        return sum(1 for i in self.queue if not i[2].cancelled)
+
+    def __push(self, event):
+        heapq.heappush(self.queue, (event.when, next(self._seq), event))
+
+    def at(self, when, callback, cost=1, deadline=None, key=None):
+        """Schedule callback at absolute time. Returns Event.
+
+        :params when: Monotonic time.
+        :params callback: Callable, gets Event as the only argument.
+        :params cost: (optional) Number of requests callback is going to send.
+        :params deadline: (optional) Time after which event is dropped.
+        :params key: (optional) Key, replaces event already scheduled with the same key.
+        """
+        if key is not None:
+            self.cancel(key)
+        event = Event(when, callback, cost=cost, deadline=deadline, key=key)
+        if key is not None:
+            self.keys[key] = event
+        self.__push(event)
+        return event
+
+    def after(self, delay, callback, **kwargs):
+        """Schedule callback after delay (seconds). Returns Event."""
+        return self.at(self.clock() + delay, callback, **kwargs)
+
+    def cancel(self, key):
+        """Cancel event.
+
+        :params key: Event or its key.
+        """
+        event = key if isinstance(key, Event) else self.keys.get(key)
+        if event is not None:
+            event.cancelled = True
+            if self.keys.get(event.key) is event:
+                del self.keys[event.key]
+
+    def scheduled(self, key):
+        """Return event scheduled with key or None."""
+        return self.keys.get(key)
+
+    def nextTime(self):
+        """Return time of next event or None if queue is empty."""
+        while self.queue and self.queue[0][2].cancelled:
+            heapq.heappop(self.queue)
+        return self.queue[0][0] if self.queue else None
+
+    def __budget(self, event, now):
+        """Reserve budget for event. Returns True if event can run now (it's rescheduled or dropped otherwise)."""
+        if self.limiter is None or not event.cost:
+            return True
+        until = event.deadline if event.deadline and event.deadline > now else now + 60
+        event.reservation = self.limiter.reserve(event.cost, until=until)
+        if event.reservation is not None:
+            return True
+        slot = self.limiter.nextSlot(count=event.cost)  # when budget frees up
+        if event.deadline is not None and slot > event.deadline:
+            self.logger.debug('dropped (no budget before deadline): %r' % event)
+            self.dropped += 1
+            self.cancel(event)
+            return False
+        event.when = slot
+        self.__push(event)
+        return False
+
+    def runPending(self):
+        """Run all due events. Returns number of events run."""
+        count = 0
+        while True:
+            when = self.nextTime()
+            now = self.clock()
+            if when is None or when > now:
+                return count
+            event = heapq.heappop(self.queue)[2]
+            if event.deadline is not None and now > event.deadline:
+                self.dropped += 1
+                self.cancel(event)
+                continue
+            if not self.__budget(event, now):
+                continue
+            if self.keys.get(event.key) is event:
+                del self.keys[event.key]
+            try:
+                if event.reservation is not None:
+                    with self.limiter.use(event.reservation):
+                        event.callback(event)
+                else:
+                    event.callback(event)
+            except Exception:  # one failed action (e.g. bid) must not stop the loop
+                self.logger.exception('event failed: %r' % event)
+                self.failed += 1
+            finally:
+                if event.reservation is not None:
+                    event.reservation.release()  # return unused requests
+            count += 1
+
+    def run(self, stop=None, idle=60):
+        """Run events until queue is empty or stop() returns True.
+
+        :params stop: (optional) Callable checked after every wake up.
+        :params idle: (optional) Maximum sleep (seconds), stop is checked at least that often.
+        """
+        while not (stop and stop()):
+            self.runPending()
+            when = self.nextTime()
+            if when is None:
+                return
+            seconds = min(max(when - self.clock(), 0), idle)
+            self.sleep(seconds)
+            metrics.sleep_seconds.inc(seconds, mode='idle')
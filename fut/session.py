@@ -0,0 +1,155 @@
+# -*- coding: utf-8 -*-
+
+"""
+fut.session
+~~~~~~~~~~~~~~~~~~~~~
+
+This module implements the fut's session (cookies & token) persistence.
+
+"""
+
+import os
+import re
+import json
+import time
+import atexit
+import threading
+
+from .cache import atomicWrite
+from .config import cookies_file, token_file, snapshot_file, session_flush_interval
+from .log import logger
+
+snapshot_version = 1
+
+
+def accountName(email):
+    """Return account name safe to use in file names.
+
+    :params email: Account email.
+    """
+    return re.sub(r'[^a-zA-Z0-9_.@-]', '_', email.lower())
+
+
+def accountPaths(email, directory):
+    """Return (cookies file, token file, snapshot file) of account, so many accounts can share one directory.
+
+    :params email: Account email.
+    :params directory: Directory for session files of all accounts.
+    """
+    name = accountName(email)
+    return (os.path.join(directory, name, cookies_file),
+            os.path.join(directory, name, token_file),
+            os.path.join(directory, name, snapshot_file))
+
+
+class SessionStore(object):
+    """Write-behind store of cookies and token.
+
+    update() only marks session as dirty, it's written atomically by background
+    thread every `interval` seconds, on flush() (login/logout) and at exit.
+    Snapshot of logged in session (sid etc.) lets next process skip the launch handshake.
+    """
+    def __init__(self, cookies_file=cookies_file, token_file=token_file, interval=session_flush_interval, snapshot_file=snapshot_file):
+        self.cookies_file = cookies_file
+        self.token_file = token_file
+        self.snapshot_file = snapshot_file
+        self.interval = interval
+        self.cookies = None
+        self.token = None
+        self.dirty = False
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._flusher = None
+        self.logger = logger(__name__)
+        atexit.register(self.flush)
+
+    def update(self, cookies, token_type, access_token):
+        """Mark session as changed (cheap, called after every request).
+
+        :params cookies: Cookie jar (LWPCookieJar).
+        :params token_type: Token type.
+        :params access_token: Access token.
+        """
+        self.cookies = cookies
+        self.token = (token_type, access_token)
+        self.dirty = True
+        if self._flusher is None:
+            self._flusher = threading.Thread(target=self.__run, name='session-flusher')
+            self._flusher.daemon = True
+            self._flusher.start()
+
+    def __run(self):
+        while not self._stop.wait(self.interval):
+            self.flush()
+
+    def flush(self):
+        """Write session to disk if it has changed."""
+        with self._lock:
+            if not self.dirty or self.cookies is None:
+                return False
+            self.dirty = False
+            try:
+                directory = os.path.dirname(os.path.abspath(self.cookies_file))
+                if not os.path.isdir(directory):
+                    os.makedirs(directory)
+                tmp = '%s.tmp' % self.cookies_file
+                self.cookies.save(filename=tmp, ignore_discard=True)
+                os.replace(tmp, self.cookies_file)
+                atomicWrite(self.token_file, '%s %s' % self.token)
+            except (IOError, OSError, RuntimeError):  # RuntimeError - cookies changed during save
+                self.dirty = True  # try again next time
+                self.logger.exception('Unable to save session.')
+                return False
+        return True
+
+    def close(self, save=True):
+        """Flush session and stop background thread.
+
+        :params save: (optional) False to drop unsaved changes.
+        """
+        self._stop.set()
+        atexit.unregister(self.flush)
+        if not save:
+            with self._lock:
+                self.dirty = False
+            return
+        self.flush()
+
+    def saveSnapshot(self, data):
+        """Save snapshot of logged in session.
+
+        :params data: Json serializable dict (see Core.snapshot).
+        """
+        if not self.snapshot_file:
+            return False
+        data = dict(data, version=snapshot_version, saved_at=time.time())
+        try:
+            atomicWrite(self.snapshot_file, json.dumps(data))
+        except (IOError, OSError):
+            self.logger.exception('Unable to save session snapshot.')
+            return False
+        return True
+
+    def loadSnapshot(self, **match):
+        """Return saved snapshot or None if there is no snapshot or it doesn't match given values.
+
+        :params match: Expected values, e.g. email='...', platform='pc'.
+        """
+        if not self.snapshot_file:
+            return None
+        try:
+            with open(self.snapshot_file, 'r') as f:
+                data = json.load(f)
+        except (IOError, OSError, ValueError):
+            return None
+        if data.get('version') != snapshot_version or any(data.get(k) != v for k, v in match.items()):
+            return None
+        return data
+
+    def dropSnapshot(self):
+        """Remove snapshot (session is not valid anymore)."""
+        if self.snapshot_file:
+            try:
+                os.remove(self.snapshot_file)
+            except OSError:
+                pass
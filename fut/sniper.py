@@ -0,0 +1,134 @@
+# -*- coding: utf-8 -*-
+
+"""
+fut.sniper
+~~~~~~~~~~~~~~~~~~~~~
+
+This module implements the fut's buy now sniper.
+
+"""
+
+import time
+
+from .config import snipe_variants
+from .log import logger
+from . import metrics
+from .tracing import traced
+
+# minimum starting bid and buy now price is 150, so these never filter anything out - they only make the url unique
+bust_prices = (None, 50, 100)
+
+
+def priceStep(price):
+    """Return market price step (bid increment) at given price."""
+    if price < 1000:
+        return 50
+    elif price < 10000:
+        return 100
+    elif price < 50000:
+        return 250
+    elif price < 100000:
+        return 500
+    return 1000
+
+
+class Sniper(object):
+    """Buy now sniper - rotates through assets, buys anything listed at or below max buy now price.
+
+    Searches and buys use fast request path (no OPTIONS, minimum delay) and
+    there is no trade status check before buying - search response is fresh
+    enough and a late buy is just rejected by the server. Consecutive searches
+    of the same asset differ in min price / min buy now price (values under
+    the market minimum, so nothing is filtered out), so they're never served
+    from cache.
+
+    Basic usage:
+
+        >>> sniper = Sniper(session, {20801: 15000})
+        >>> bought = sniper.run(time.monotonic() + 60)
+    """
+    def __init__(self, core, targets, variants=snipe_variants, clock=time.monotonic):
+        """:params core: Core.
+        :params targets: Dict {asset_id: max_buy}, may be changed while sniping.
+        :params variants: (optional) Number of different (min price, min buy now price) pairs per asset (up to 9).
+        :params clock: (optional) Monotonic clock.
+        """
+        self.core = core
+        self.targets = targets
+        self.variants = variants
+        self.clock = clock
+        self.searches = 0
+        self.attempts = []  # {'assetId', 'tradeId', 'price', 'success', 'latency'}
+        self.tried = set()  # trade ids, failed buy is not retried
+        self._next = 0  # index of next asset
+        self._variant = {}  # asset_id: searches sent
+        self.logger = logger(__name__)
+
+    def params(self, asset_id):
+        """Return (min_price, min_buy) for next search of asset, max buy now price is always user's max."""
+        n = self._variant.get(asset_id, 0) % self.variants
+        self._variant[asset_id] = n + 1
+        return bust_prices[n % len(bust_prices)], bust_prices[n // len(bust_prices) % len(bust_prices)]
+
+    def nextAsset(self):
+        """Return next asset id (round-robin) or None if there is nothing to snipe."""
+        assets = sorted(self.targets)
+        if not assets:
+            return None
+        asset_id = assets[self._next % len(assets)]
+        self._next += 1
+        return asset_id
+
+    @traced('Sniper.step')
+    def step(self):
+        """Search next asset and buy every match. Returns list of bought items."""
+        asset_id = self.nextAsset()
+        if asset_id is None:
+            return []
+        min_price, min_buy = self.params(asset_id)
+        items = self.core.search(ctype='player', assetId=asset_id, min_price=min_price, min_buy=min_buy,
+                                 max_buy=self.targets[asset_id], fast=True)
+        detected = self.core.last_request_time[1]
+        self.searches += 1
+        bought = []
+        for item in sorted(items, key=lambda i: i['buyNowPrice']):
+            price = item['buyNowPrice']
+            if item['tradeId'] in self.tried or not price or price > self.targets.get(asset_id, 0):
+                continue
+            if price > self.core.credits:
+                self.logger.info('buy now skipped, not enough credits: %s for %s' % (item['tradeId'], price))
+                continue
+            self.tried.add(item['tradeId'])
+            success = self.core.bid(item['tradeId'], price, fast=True)
+            latency = self.core.last_request_time[1] - detected  # response to search -> response to buy now
+            self.attempts.append({'assetId': asset_id, 'tradeId': item['tradeId'], 'price': price,
+                                  'success': success, 'latency': latency})
+            self.logger.info('buy now %s: %s for %s (%.3fs after detection)'
+                             % ('bought' if success else 'failed', item['tradeId'], price, latency))
+            if success:
+                bought.append(item)
+        return bought
+
+    def run(self, until, stop=None, reserve=10):
+        """Snipe until given (monotonic) time. Returns list of bought items.
+
+        :params until: Monotonic time to stop at.
+        :params stop: (optional) Callable, sniping stops when it returns True.
+        :params reserve: (optional) Stop when requests budget drops to this many requests.
+        """
+        bought = []
+        with metrics.mode('buy_now'):
+            while self.clock() < until and not (stop and stop()):
+                if self.core.limiter.remaining() <= reserve or not self.targets:
+                    break
+                bought.extend(self.step())
+        return bought
+
+    def stats(self):
+        """Return searches, buy now attempts, purchases and detection-to-purchase latency (seconds)."""
+        latencies = sorted(a['latency'] for a in self.attempts)
+        return {'searches': self.searches,
+                'attempts': len(self.attempts),
+                'bought': sum(1 for a in self.attempts if a['success']),
+                'latency_median': latencies[len(latencies) // 2] if latencies else None,
+                'latency_max': latencies[-1] if latencies else None}
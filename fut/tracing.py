@@ -0,0 +1,153 @@
+# -*- coding: utf-8 -*-
+
+"""
+fut.tracing
+~~~~~~~~~~~~~~~~~~~~~
+
+This module implements the fut's sampled tracing spans with folded stacks (flame graph) export.
+
+"""
+
+import time
+import random
+import threading
+import functools
+
+from .config import trace_sample_rate
+from . import cache
+
+
+class Span(object):
+    """Timed block, nested spans of the same thread form a stack."""
+    __slots__ = ('tracer', 'name', 'active')
+
+    def __init__(self, tracer, name):
+        self.tracer = tracer
+        self.name = name
+        self.active = False
+
+    def __enter__(self):
+        local = self.tracer._local
+        if getattr(local, 'skip', 0):  # inside trace which is not sampled
+            local.skip += 1
+            return self
+        frames = getattr(local, 'frames', None)
+        if frames is None:  # root span decides for the whole trace
+            self.tracer.traces += 1
+            if random.random() >= self.tracer.sample_rate:
+                local.skip = 1
+                return self
+            frames = local.frames = []
+        frames.append([self.name, self.tracer.clock(), 0.0])  # name, start, time spent in children
+        self.active = True
+        return self
+
+    def __exit__(self, *exc):
+        local = self.tracer._local
+        if not self.active:
+            local.skip -= 1
+            return False
+        frames = local.frames
+        stack = ';'.join(f[0] for f in frames)
+        name, start, children = frames.pop()
+        elapsed = self.tracer.clock() - start
+        if frames:
+            frames[-1][2] += elapsed
+        else:
+            local.frames = None
+        self.tracer.add(stack, elapsed - children)
+        return False
+
+
+class Tracer(object):
+    """Sampled spans aggregated into folded stacks (self time per stack).
+
+    Sampling is decided once per trace (root span, e.g. one bot cycle), spans
+    of not sampled traces only touch a thread-local counter, so tracing can
+    stay on in production.
+
+    Basic usage:
+
+        >>> with tracer.span('cycle'):
+        ...     with tracer.span('watchlist'):
+        ...         session.watchlist()
+        >>> tracer.write('trace.folded')  # flamegraph.pl trace.folded > trace.svg
+    """
+    def __init__(self, sample_rate=trace_sample_rate, clock=time.perf_counter):
+        """:params sample_rate: (optional) Fraction of traces recorded (0 disables tracing, 1 records everything).
+        :params clock: (optional) High resolution clock.
+        """
+        self.sample_rate = sample_rate
+        self.clock = clock
+        self.stacks = {}  # 'root;child;grandchild': [self seconds, calls]
+        self.traces = 0  # root spans seen (sampled or not)
+        self._local = threading.local()
+        self._lock = threading.Lock()
+
+    def span(self, name):
+        """Return span (context manager).
+
+        :params name: Span name (no semicolons).
+        """
+        return Span(self, name)
+
+    def add(self, stack, seconds):
+        """Record self time of stack.
+
+        :params stack: Semicolon separated span names, root first.
+        :params seconds: Time spent in the innermost span (excluding children).
+        """
+        with self._lock:
+            record = self.stacks.get(stack)
+            if record is None:
+                record = self.stacks[stack] = [0.0, 0]
+            record[0] += seconds
+            record[1] += 1
+
+    def reset(self):
+        """Forget recorded stacks."""
+        with self._lock:
+            self.stacks = {}
+
+    def folded(self):
+        """Return recorded stacks in folded format ('a;b;c microseconds' lines) for flamegraph.pl / speedscope."""
+        with self._lock:
+            stacks = sorted(self.stacks.items())
+        return ''.join('%s %d\n' % (stack, round(seconds * 1000000)) for stack, (seconds, calls) in stacks)
+
+    def write(self, path):
+        """Write folded stacks to file atomically.
+
+        :params path: File path.
+        """
+        cache.atomicWrite(path, self.folded())
+
+
+tracer = Tracer()
+
+
+def traced(name=None):
+    """Decorator - run function in span (named after function by default).
+
+    :params name: (optional) Span name.
+    """
+    def decorator(func):
+        span_name = name or func.__name__
+
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with Span(tracer, span_name):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
+
+
+def traceMethods(cls):
+    """Class decorator - every public method (and fut's __private__ ones like __request__) runs in span 'Class.method'."""
+    for name, value in list(vars(cls).items()):
+        if not callable(value) or isinstance(value, type) or name in dir(object):
+            continue
+        if name.startswith('_') and not (name.startswith('__') and name.endswith('__')):
+            continue
+        setattr(cls, name, traced('%s.%s' % (cls.__name__, name))(value))
+    return cls
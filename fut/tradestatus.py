@@ -0,0 +1,116 @@
+# -*- coding: utf-8 -*-
+
+"""
+fut.tradestatus
+~~~~~~~~~~~~~~~~~~~~~
+
+This module implements the fut's trade status multiplexer.
+
+"""
+
+import time
+import threading
+
+from .config import trade_status_window, trade_status_ttl, trade_status_batch
+
+
+class TradeStatus(object):
+    """Trade statuses shared by all callers.
+
+    Fresh statuses (from any response: search, watchlist, bid etc.) are served
+    from cache. Missing ones are fetched right away when nobody else is
+    asking, ids requested while a fetch is in flight are sent together with
+    the next multi-id trade/status request. Only when other callers are
+    around, collector waits up to `window` seconds (or until batch is full)
+    for them to join.
+    """
+    def __init__(self, request, window=trade_status_window, max_age=trade_status_ttl, batch=trade_status_batch):
+        """:params request: Callable sending trade/status request for list of trade ids, returns parsed items."""
+        self.request = request
+        self.window = window
+        self.max_age = max_age
+        self.batch = batch
+        self.cache = {}  # trade_id: (monotonic time, status)
+        self.fetched = {}  # trade_id: monotonic time of last request (expired trades are not returned at all)
+        self.pending = set()
+        self.collecting = False
+        self.callers = 0  # threads inside get
+        self._lock = threading.Condition()
+
+    def update(self, items):
+        """Store statuses received in any response.
+
+        :params items: Parsed items (itemParse), items without tradeId are ignored.
+        """
+        now = time.monotonic()
+        with self._lock:
+            for i in items:
+                if i.get('tradeId'):
+                    previous = self.cache.get(i['tradeId'])
+                    if previous:  # keep item details from full responses (search, watchlist)
+                        i = dict(previous[1], **i)
+                    self.cache[i['tradeId']] = (now, i)
+            if len(self.cache) > self.batch * 100:  # forget old auctions
+                for trade_id in [k for k, v in self.cache.items() if v[0] < now - self.max_age]:
+                    del self.cache[trade_id]
+                    self.fetched.pop(trade_id, None)
+
+    def invalidate(self, trade_id):
+        """Forget cached status (e.g. after our bid).
+
+        :params trade_id: Trade id.
+        """
+        with self._lock:
+            self.cache.pop(trade_id, None)
+
+    def get(self, trade_id, max_age=None):
+        """Return statuses of trades (only existing ones, expired trades are skipped like in tradeStatus).
+
+        :params trade_id: Trade id or list of them.
+        :params max_age: (optional) Maximum age (in seconds) of cached status.
+        """
+        if not isinstance(trade_id, (list, tuple)):
+            trade_id = (trade_id,)
+        trade_id = [int(i) for i in trade_id]
+        started = time.monotonic()
+        since = started - (self.max_age if max_age is None else max_age)
+        with self._lock:
+            self.callers += 1
+            try:
+                return self.__get(trade_id, started, since)
+            finally:
+                self.callers -= 1
+
+    def __get(self, trade_id, started, since):
+        """Return statuses of trades, fetching missing ones (expects self._lock to be held)."""
+        missing = [i for i in trade_id if self.cache.get(i, (since - 1,))[0] < since]
+        while True:
+            missing = [i for i in missing if self.fetched.get(i, started - 1) < started]
+            if not missing:
+                break
+            if self.collecting:
+                self.pending.update(missing)
+                self._lock.notify_all()  # collector flushes as soon as batch is full
+                self._lock.wait()  # woken up after every fetch
+                continue
+            self.pending.update(missing)
+            self.collecting = True
+            try:
+                if self.window and self.callers > 1:  # others are around, let them join this request
+                    self._lock.wait_for(lambda: len(self.pending) >= self.batch, self.window)
+                batch, self.pending = sorted(self.pending), set()
+                self._lock.release()
+                try:
+                    for n in range(0, len(batch), self.batch):
+                        chunk = batch[n:n + self.batch]
+                        items = self.request(chunk)
+                        now = time.monotonic()
+                        self.update(items)
+                        with self._lock:
+                            self.fetched.update((i, now) for i in chunk)
+                finally:
+                    self._lock.acquire()
+            finally:
+                self.collecting = False
+                self._lock.notify_all()
+        return [self.cache[i][1] for i in trade_id if i in self.cache and self.cache[i][0] >= since]
@@ -1,30 +1,120 @@
+import time
+import threading
+
 import requests
 
+from . import cache
+from .config import timeout, config_ttl, remote_config_ttl
 from .exceptions import FutError
+from .log import logger
+
+config_url = 'https://www.easports.com/fifa/ultimate-team/web-app/config/config.json'
+remote_config_url = 'https://www.easports.com/fifa/ultimate-team/web-app/content/B1BA185F-AD7C-4128-8A64-746DE4EC5A82/2018/fut/config/companion/remoteConfig.json'
+card_info_url = 'https://fifa18.content.easports.com/fifa/fltOnlineAssets/B1BA185F-AD7C-4128-8A64-746DE4EC5A82/2018/fut/items/web/'  # TODO: get hash from somewhere, dynamic year
+messages_url = 'https://www.easports.com/fifa/ultimate-team/web-app/loc/en_US.json'
+
+
+class RemoteConfig(object):
+    """Json config downloaded on first use and cached on disk.
+
+    Stale (older than ttl) config is served while fresh one is downloaded in background.
+    """
+    def __init__(self, name, url, ttl, timeout=timeout):
+        self.name = name
+        self.url = url
+        self.ttl = ttl
+        self.timeout = timeout
+        self.loaded_at = None
+        self._data = None
+        self._lock = threading.Lock()
+        self._refreshing = False
+        self.logger = logger(__name__)
+
+    def refresh(self):
+        """Download config and save it in cache."""
+        data = requests.get(self.url, timeout=self.timeout).json()
+        cache.save('%s.json' % self.name, data)
+        self._data = data
+        self.loaded_at = time.time()
+        return data
+
+    def __backgroundRefresh(self):
+        try:
+            self.refresh()
+        except (requests.RequestException, ValueError):
+            self.logger.exception('Unable to refresh %s, using cached one.' % self.name)
+        finally:
+            self._refreshing = False
+
+    @property
+    def data(self):
+        """Return config, loads it on first use."""
+        if self._data is None:
+            with self._lock:
+                if self._data is None:
+                    data, age = cache.load('%s.json' % self.name)
+                    if data is None:
+                        return self.refresh()
+                    self._data = data
+                    self.loaded_at = time.time() - age
+        if time.time() - self.loaded_at > self.ttl and not self._refreshing:
+            self._refreshing = True
+            threading.Thread(target=self.__backgroundRefresh, daemon=True).start()
+        return self._data
+
+    def fresh(self):
+        """Return config, downloads it first (blocking) if cached one is older than ttl.
+
+        Used for gating checks (maintenance) where stale value is not good enough.
+        """
+        self.data  # loads it on first use
+        if time.time() - self.loaded_at > self.ttl:
+            with self._lock:
+                if time.time() - self.loaded_at > self.ttl:
+                    try:
+                        self.refresh()
+                    except (requests.RequestException, ValueError):
+                        self.logger.exception('Unable to refresh %s, using cached one.' % self.name)
+        return self._data
+
+    def __getitem__(self, key):
+        return self.data[key]
+
 
 # config
-rc = requests.get('https://www.easports.com/fifa/ultimate-team/web-app/config/config.json').json()
-auth_url = rc['authURL']
-pin_url = rc['pinURL']  # TODO: urls in dict?
-client_id = rc['eadpClientId']
-fun_captcha_public_key = rc['funCaptchaPublicKey']
+config = RemoteConfig('config', config_url, ttl=config_ttl)
+# remote config - refreshed every remote_config_ttl seconds
+remote_config = RemoteConfig('remote_config', remote_config_url, ttl=remote_config_ttl)
+
+
+# config values - resolved on call, not on import
+def authUrl():
+    return config['authURL']
+
+
+def pinUrl():
+    return config['pinURL']  # TODO: urls in dict?
+
 
+def clientId():
+    return config['eadpClientId']
 
-# remote config - should be refresh every x seconds
-rc = requests.get('https://www.easports.com/fifa/ultimate-team/web-app/content/B1BA185F-AD7C-4128-8A64-746DE4EC5A82/2018/fut/config/companion/remoteConfig.json').json()
 
-if rc['pin'] != {"b": True, "bf": 500, "bs": 10, "e": True, "r": 3, "rf": 300}:
-    print('>>> WARNING: ping variables changed: %s' % rc['pin'])
+def funCaptchaPublicKey():
+    return config['funCaptchaPublicKey']
 
-if rc['futweb_maintenance']:
-    raise FutError('Futweb maintenance, please retry in few minutes.')
+
+def checkRemoteConfig():
+    """Validate remote config, raises FutError during futweb maintenance."""
+    rc = remote_config.fresh()  # cached maintenance flag might be outdated
+    if rc['pin'] != {"b": True, "bf": 500, "bs": 10, "e": True, "r": 3, "rf": 300}:
+        print('>>> WARNING: ping variables changed: %s' % rc['pin'])
+
+    if rc['futweb_maintenance']:
+        raise FutError('Futweb maintenance, please retry in few minutes.')
 
 # TODO: parse itemsPerPage
 # "itemsPerPage": {
 # 	"club" : 45,
 # 	"transferMarket" : 15
 # },
-
-
-card_info_url = 'https://fifa18.content.easports.com/fifa/fltOnlineAssets/B1BA185F-AD7C-4128-8A64-746DE4EC5A82/2018/fut/items/web/'  # TODO: get hash from somewhere, dynamic year
-messages_url = 'https://www.easports.com/fifa/ultimate-team/web-app/loc/en_US.json'
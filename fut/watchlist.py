@@ -0,0 +1,92 @@
+# -*- coding: utf-8 -*-
+
+"""
+fut.watchlist
+~~~~~~~~~~~~~~~~~~~~~
+
+This module implements the fut's watchlist state (delta sync).
+
+"""
+
+import threading
+from collections import namedtuple
+
+from . import metrics
+
+# kind: new/outbid/price_changed/won/lost/expired/removed, previous: item from previous sync or None
+WatchlistEvent = namedtuple('WatchlistEvent', ('kind', 'trade_id', 'item', 'previous'))
+
+
+class WatchlistState(object):
+    """Last known watchlist keyed by trade id, every sync is diffed against it.
+
+    Only changed auctions produce events, so strategy and gui don't have to
+    walk whole watchlist again.
+    """
+    def __init__(self):
+        self.items = {}  # trade_id: item
+        self.counted = set()  # trade ids already counted in metrics (forget doesn't clear it)
+        self._lock = threading.Lock()
+
+    def __len__(self):
+        return len(self.items)
+
+    def __iter__(self):
+        return iter(list(self.items.values()))
+
+    @staticmethod
+    def diff(previous, item):
+        """Return kind of change between two versions of auction or None if nothing important has changed.
+
+        :params previous: Item from previous sync (None for new ones).
+        :params item: Current item.
+        """
+        closed = item['tradeState'] == 'closed'
+        if closed and (previous is None or previous['tradeState'] != 'closed'):
+            return 'won' if item['bidState'] == 'highest' else 'lost'
+        if item['tradeState'] == 'expired':  # ended without bids
+            return 'expired' if previous is None or previous['tradeState'] != 'expired' else None
+        if previous is None:
+            return 'new'
+        if item['bidState'] != 'highest' and previous['bidState'] == 'highest':
+            return 'outbid'
+        if item['currentBid'] != previous['currentBid']:
+            return 'price_changed'
+        return None
+
+    def sync(self, items):
+        """Replace state with fetched watchlist. Returns list of WatchlistEvent.
+
+        :params items: Parsed watchlist items (itemParse).
+        """
+        events = []
+        with self._lock:
+            current = dict((i['tradeId'], i) for i in items)
+            for trade_id, item in current.items():
+                previous = self.items.get(trade_id)
+                kind = self.diff(previous, item)
+                if kind:
+                    events.append(WatchlistEvent(kind, trade_id, item, previous))
+                if kind in ('won', 'lost', 'expired') and trade_id not in self.counted:
+                    self.counted.add(trade_id)
+                    metrics.auctions.inc(result=kind)
+                    if kind == 'won':
+                        metrics.coins_spent.inc(item['currentBid'])
+            for trade_id, previous in self.items.items():
+                if trade_id not in current:  # deleted or moved to pile
+                    events.append(WatchlistEvent('removed', trade_id, None, previous))
+            self.items = current
+        return events
+
+    def reset(self):
+        """Forget all auctions, every one is reported as new on next sync (results already counted in metrics are kept)."""
+        with self._lock:
+            self.items = {}
+
+    def forget(self, trade_id):
+        """Forget auction, it's reported again on next sync (e.g. action on it has failed).
+
+        :params trade_id: Trade id.
+        """
+        with self._lock:
+            self.items.pop(trade_id, None)
@@ -0,0 +1,35 @@
+# -*- coding: utf-8 -*-
+
+import fut.core
+from fut.catalogue import PlayerCatalogue
+
+old = {'Players': [{'id': 20801, 'f': 'Cristiano', 'l': 'Ronaldo', 'r': 94, 'n': 38}], 'LegendsPlayers': []}
+new = {'Players': [{'id': 20801, 'f': 'Cristiano', 'l': 'Ronaldo', 'r': 95, 'n': 38},
+                   {'id': 158023, 'f': 'Lionel', 'l': 'Messi', 'r': 94, 'n': 52}], 'LegendsPlayers': []}
+
+
+def test_players_held_across_refresh(tmp_path, monkeypatch):
+    catalogue = PlayerCatalogue(file_path=str(tmp_path / 'players.bin'))
+    responses = [old, new]
+    monkeypatch.setattr(catalogue, '_PlayerCatalogue__fetch', lambda timeout=None: responses.pop(0))
+    monkeypatch.setattr(fut.core, 'catalogue', catalogue)
+
+    players = fut.core.players()  # what Core.players returns
+    assert players[20801]['rating'] == 94
+    catalogue.refresh()
+
+    # catalogue held by caller keeps working after it was swapped
+    assert players[20801]['rating'] == 94
+    assert players.name(20801) == 'Cristiano Ronaldo'
+    assert 158023 not in players
+    assert fut.core.players()[20801]['rating'] == 95
+    assert fut.core.players().name(158023) == 'Lionel Messi'
+
+
+def test_ready_after_index(tmp_path, monkeypatch):
+    catalogue = PlayerCatalogue(file_path=str(tmp_path / 'players.bin'))
+    monkeypatch.setattr(catalogue, '_PlayerCatalogue__fetch', lambda timeout=None: new)
+    assert not catalogue.ready()
+    catalogue.index()  # e.g. in background thread after login
+    assert catalogue.ready()
+    assert [i['id'] for i in catalogue.search('mess')] == [158023]
@@ -0,0 +1,31 @@
+# -*- coding: utf-8 -*-
+
+from fut.scheduler import Scheduler
+
+
+class Clock(object):
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+    def sleep(self, seconds):
+        self.now += seconds
+
+
+def test_failed_callback_doesnt_stop_loop():
+    clock = Clock()
+    scheduler = Scheduler(clock=clock, sleep=clock.sleep)
+    ran = []
+
+    def fail(event):
+        raise ValueError('bid failed')
+
+    scheduler.at(1, lambda e: ran.append(e.key), key='first')
+    scheduler.at(2, fail, key='failing')
+    scheduler.at(3, lambda e: ran.append(e.key), key='later')
+    scheduler.run()
+    assert ran == ['first', 'later']
+    assert scheduler.failed == 1
+    assert scheduler.scheduled('failing') is None
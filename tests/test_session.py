@@ -0,0 +1,31 @@
+# -*- coding: utf-8 -*-
+
+import atexit
+
+from fut.session import SessionStore
+
+
+class Cookies(object):
+    def save(self, filename, ignore_discard=False):
+        with open(filename, 'w') as f:
+            f.write('cookies')
+
+
+def test_close_without_save(tmp_path, monkeypatch):
+    hooks = []
+    monkeypatch.setattr(atexit, 'register', hooks.append)
+    monkeypatch.setattr(atexit, 'unregister', hooks.remove)
+    store = SessionStore(str(tmp_path / 'cookies.txt'), str(tmp_path / 'token.txt'), interval=3600)
+    store.update(Cookies(), 'Bearer', 'abc')
+    store.close(save=False)
+    assert not hooks  # nothing is written at exit either
+    assert not store.flush()
+    assert not (tmp_path / 'cookies.txt').exists()
+    assert not (tmp_path / 'token.txt').exists()
+
+
+def test_close_saves(tmp_path):
+    store = SessionStore(str(tmp_path / 'cookies.txt'), str(tmp_path / 'token.txt'), interval=3600)
+    store.update(Cookies(), 'Bearer', 'abc')
+    store.close()
+    assert (tmp_path / 'token.txt').read_text() == 'Bearer abc'